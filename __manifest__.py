@@ -22,7 +22,8 @@ Long description of module's purpose
 
     # always loaded
     'data': [
-        # 'security/ir.model.access.csv',
+        'security/ir.model.access.csv',
+      'data/kitchen_screen_cron.xml',
       'views/kitchen_screen_inherited_views.xml',
         
         
@@ -3,4 +3,7 @@
 from . import models
 from . import pos_order
 from . import kitchen_screen_multi
-from . import pos_session
\ No newline at end of file
+from . import pos_session
+from . import product_product
+from . import kitchen_order_queue
+from . import kitchen_screen_event
@@ -0,0 +1,159 @@
+# -*- coding: utf-8 -*-
+from odoo import models, fields, api
+from odoo.service.model import PG_CONCURRENCY_ERRORS_TO_RETRY
+from psycopg2 import OperationalError
+import logging
+
+_logger = logging.getLogger(__name__)
+
+
+class KitchenOrderQueue(models.Model):
+    """
+    File d'attente des commandes cuisine envoyées par le POS.
+    Le POS reçoit un accusé de réception immédiat ; le traitement
+    (création, assignation des écrans, notifications) est fait par le cron.
+    """
+    _name = 'kitchen.order.queue'
+    _description = 'Kitchen Order Queue'
+    _order = 'id'
+
+    pos_reference = fields.Char(string='POS Reference', readonly=True, index=True)
+    config_id = fields.Many2one('pos.config', string='POS', readonly=True, ondelete='cascade')
+    payload = fields.Json(string='Payload', readonly=True)
+    state = fields.Selection([
+        ('pending', 'Pending'),
+        ('done', 'Done'),
+        ('failed', 'Failed'),
+    ], string='State', default='pending', required=True, readonly=True, index=True)
+    order_id = fields.Many2one('pos.order', string='Kitchen Order', readonly=True, ondelete='set null')
+    error = fields.Text(string='Error', readonly=True)
+    processed_at = fields.Datetime(string='Processed At', readonly=True)
+
+    # Nombre de payloads traités par lot et nombre de lots par exécution du cron
+    _QUEUE_BATCH_SIZE = 50
+    _QUEUE_MAX_BATCHES = 20
+
+    @api.model
+    def enqueue_kitchen_orders(self, orders_data):
+        """
+        ✅ Point d'entrée du POS : persiste les payloads bruts et répond aussitôt.
+        Retourne l'accusé de réception avec les ids de file à suivre.
+        """
+        try:
+            entries = self.sudo().create([{
+                'pos_reference': order_data.get('pos_reference'),
+                'config_id': order_data.get('config_id'),
+                'payload': order_data,
+            } for order_data in orders_data])
+
+            cron = self.env.ref(
+                'pos_kitchen_screen_odoo_extension.ir_cron_process_kitchen_queue',
+                raise_if_not_found=False
+            )
+            if cron:
+                cron.sudo()._trigger()
+
+            _logger.info(f"[KITCHEN QUEUE] 📥 {len(entries)} orders queued: {entries.ids}")
+            return {'queued': True, 'queue_ids': entries.ids}
+
+        except Exception as e:
+            _logger.error(f"[KITCHEN QUEUE] ❌ Error queuing orders: {str(e)}", exc_info=True)
+            return {'queued': False, 'queue_ids': [], 'error': str(e)}
+
+    @api.model
+    def get_queue_status(self, queue_ids):
+        """✅ Statut final des entrées de file (interrogé par le POS)"""
+        entries = self.sudo().browse(queue_ids).exists()
+        return [{
+            'id': entry.id,
+            'state': entry.state,
+            'pos_reference': entry.pos_reference,
+            'order_id': entry.order_id.id or False,
+            'error': entry.error or False,
+        } for entry in entries]
+
+    def _lock_pending_batch(self, limit):
+        """Verrouille le prochain lot FIFO (SKIP LOCKED : plusieurs workers possibles)"""
+        self.env.cr.execute("""
+            SELECT id FROM kitchen_order_queue
+             WHERE state = 'pending'
+          ORDER BY id
+             LIMIT %s
+               FOR UPDATE SKIP LOCKED
+        """, [limit])
+        return self.browse([row[0] for row in self.env.cr.fetchall()])
+
+    def _process_batch(self):
+        """Traite un lot via create_or_update_kitchen_order et met à jour les entrées"""
+        PosOrder = self.env['pos.order'].sudo()
+        order_ids = PosOrder.create_or_update_kitchen_order([entry.payload for entry in self])
+
+        orders = PosOrder.browse(order_ids or [])
+        order_by_key = {(order.pos_reference, order.config_id.id): order for order in orders}
+        now = fields.Datetime.now()
+        for entry in self:
+            order = order_by_key.get((entry.pos_reference, entry.config_id.id))
+            if order:
+                entry.write({'state': 'done', 'order_id': order.id, 'processed_at': now})
+            else:
+                entry.write({
+                    'state': 'failed',
+                    'processed_at': now,
+                    'error': 'Batch failed' if order_ids is False else 'Order rejected (see server log)',
+                })
+
+    @api.model
+    def _cron_process_kitchen_queue(self):
+        """
+        ✅ Worker : traite la file en lots FIFO, un commit par lot.
+        Se relance lui-même s'il reste des entrées après le nombre maximal de lots.
+        """
+        for _batch in range(self._QUEUE_MAX_BATCHES):
+            entries = self.sudo()._lock_pending_batch(self._QUEUE_BATCH_SIZE)
+            if not entries:
+                return
+
+            _logger.info(f"[KITCHEN QUEUE] ⚙️ Processing {len(entries)} queued orders")
+            entry_ids = entries.ids
+            try:
+                entries._process_batch()
+                # Le commit exécute le flush precommit (compteurs d'écran, bus)
+                self.env.cr.commit()
+            except OperationalError as e:
+                if e.pgcode not in PG_CONCURRENCY_ERRORS_TO_RETRY:
+                    self._fail_batch(entry_ids, e)
+                    continue
+                # ✅ Conflit de concurrence (ex. compteurs d'un écran modifiés par un
+                # cuisinier) : le lot reste en attente et sera repris
+                _logger.warning(f"[KITCHEN QUEUE] ⏳ Concurrent update, batch retried later: {e.pgcode}")
+                self.env.cr.rollback()
+                self._trigger_queue_cron()
+                return
+            except Exception as e:
+                self._fail_batch(entry_ids, e)
+
+        self._trigger_queue_cron()
+
+    def _fail_batch(self, entry_ids, error):
+        """Annule le lot et marque ses entrées en échec (commit séparé)"""
+        _logger.error(f"[KITCHEN QUEUE] ❌ Batch error: {str(error)}", exc_info=True)
+        self.env.cr.rollback()
+        self.sudo().browse(entry_ids).write({
+            'state': 'failed',
+            'error': str(error),
+            'processed_at': fields.Datetime.now(),
+        })
+        self.env.cr.commit()
+
+    def _trigger_queue_cron(self):
+        """Relance le worker de la file dès que possible"""
+        self.env.ref('pos_kitchen_screen_odoo_extension.ir_cron_process_kitchen_queue')._trigger()
+
+    @api.autovacuum
+    def _gc_processed_entries(self):
+        """Supprime les entrées traitées depuis plus d'un jour"""
+        limit_date = fields.Datetime.subtract(fields.Datetime.now(), days=1)
+        self.sudo().search([
+            ('state', 'in', ('done', 'failed')),
+            ('processed_at', '<', limit_date),
+        ]).unlink()
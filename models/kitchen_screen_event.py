@@ -0,0 +1,141 @@
+# -*- coding: utf-8 -*-
+from odoo import models, fields, api
+from odoo.tools import date_utils
+from collections import defaultdict
+import json
+import logging
+
+_logger = logging.getLogger(__name__)
+
+
+class KitchenScreenEvent(models.Model):
+    """
+    Journal des messages bus envoyés aux écrans cuisine.
+    Chaque message porte un numéro de séquence par écran : un écran qui
+    détecte un trou récupère uniquement les événements manqués via resync().
+    """
+    _name = 'kitchen.screen.event'
+    _description = 'Kitchen Screen Event'
+    _order = 'screen_id, seq'
+
+    screen_id = fields.Many2one('kitchen.screen', string='Screen', required=True, readonly=True, ondelete='cascade')
+    seq = fields.Integer(string='Sequence', required=True, readonly=True)
+    notification_type = fields.Char(string='Type', readonly=True)
+    message = fields.Json(string='Message', readonly=True)
+    dedup_key = fields.Char(
+        string='Deduplication Key',
+        readonly=True,
+        index=True,
+        help='Event type, order and content fingerprint: identical events are sent only once'
+    )
+
+    _sql_constraints = [
+        ('screen_seq_uniq', 'unique(screen_id, seq)', 'Event sequence must be unique per screen.'),
+    ]
+
+    # Durée de conservation du journal (au-delà, l'écran fait un rechargement complet)
+    _EVENT_RETENTION_HOURS = 24
+    # Nombre maximal d'événements renvoyés par resync
+    _RESYNC_LIMIT = 500
+    # Fenêtre pendant laquelle un événement identique n'est pas renvoyé
+    _DEDUP_WINDOW_MINUTES = 10
+
+    @api.model
+    def _filter_duplicate_events(self, entries):
+        """
+        ✅ Retire des entrées [(channel, type, message, dedup_key)] celles déjà
+        envoyées au même écran dans la fenêtre de dédoublonnage (toutes
+        sources confondues : soumission POS, trigger_kitchen_notifications...).
+        """
+        keys = {dedup_key for _channel, _type, _message, dedup_key in entries if dedup_key}
+        if not keys:
+            return entries
+
+        since = fields.Datetime.subtract(fields.Datetime.now(), minutes=self._DEDUP_WINDOW_MINUTES)
+        sent = {
+            (event['screen_id'][0], event['dedup_key'])
+            for event in self.sudo().search_read([
+                ('dedup_key', 'in', list(keys)),
+                ('create_date', '>=', since),
+            ], ['screen_id', 'dedup_key'])
+        }
+
+        kept = [
+            entry for entry in entries
+            if not entry[3] or (entry[2].get('s'), entry[3]) not in sent
+        ]
+        if len(kept) < len(entries):
+            _logger.info(f"[KITCHEN SCREEN] ♻️ {len(entries) - len(kept)} duplicate notifications skipped")
+        return kept
+
+    @api.model
+    def _record_kitchen_events(self, notifications, last_seqs):
+        """
+        ✅ Numérote et journalise les notifications [(channel, type, message, dedup_key)].
+        ``last_seqs`` donne la dernière séquence réservée par écran pour ces
+        événements (kitchen.screen._flush_kitchen_versions, dans le même UPDATE
+        que la version) : les numéros sont croissants et sans trou.
+        Ajoute la clé "q" à chaque message.
+        """
+        by_screen = defaultdict(list)
+        for _channel, notification_type, message, dedup_key in notifications:
+            if message.get('s') in last_seqs:
+                by_screen[message['s']].append((notification_type, message, dedup_key))
+
+        values = []
+        for screen_id, events in by_screen.items():
+            first_seq = last_seqs[screen_id] - len(events) + 1
+            for offset, (notification_type, message, dedup_key) in enumerate(events):
+                message['q'] = first_seq + offset
+                values.append({
+                    'screen_id': screen_id,
+                    'seq': message['q'],
+                    'notification_type': notification_type,
+                    # Sérialisé comme bus.bus (dates du delta en chaînes) : fields.Json
+                    # utilise json.dumps sans gestion des datetime
+                    'message': json.loads(json.dumps(message, default=date_utils.json_default)),
+                    'dedup_key': dedup_key,
+                })
+
+        if values:
+            self.sudo().create(values)
+
+    @api.model
+    def _resync(self, screen_id, from_seq):
+        """
+        ✅ Événements d'un écran de séquence > from_seq, dans l'ordre.
+        ``complete`` vaut False si des événements ont déjà été purgés
+        (ou dépassent la limite) : l'écran doit alors recharger via get_details.
+        """
+        screen = self.env['kitchen.screen'].sudo().browse(screen_id).exists()
+        if not screen:
+            return {'events': [], 'last_seq': 0, 'complete': False}
+
+        from_seq = from_seq or 0
+        last_seq = screen.kitchen_event_seq
+        events = self.sudo().search([
+            ('screen_id', '=', screen.id),
+            ('seq', '>', from_seq),
+        ], order='seq', limit=self._RESYNC_LIMIT)
+
+        expected = last_seq - from_seq
+        complete = len(events) == expected and (not events or events[0].seq == from_seq + 1)
+        _logger.info(
+            f"[KITCHEN SCREEN] 🔁 Resync screen {screen.id} from {from_seq}: "
+            f"{len(events)}/{expected} events"
+        )
+        return {
+            'events': [{
+                'seq': event.seq,
+                'type': event.notification_type,
+                'message': event.message,
+            } for event in events],
+            'last_seq': last_seq,
+            'complete': complete,
+        }
+
+    @api.autovacuum
+    def _gc_old_events(self):
+        """Purge des événements plus anciens que la durée de conservation"""
+        limit_date = fields.Datetime.subtract(fields.Datetime.now(), hours=self._EVENT_RETENTION_HOURS)
+        self.sudo().search([('create_date', '<', limit_date)]).unlink()
@@ -1,6 +1,7 @@
 # -*- coding: utf-8 -*-
-from odoo import api, fields, models, _
+from odoo import api, fields, models, tools, _
 from odoo.exceptions import ValidationError
+from odoo.tools import frozendict
 import logging
 
 _logger = logging.getLogger(__name__)
@@ -61,6 +62,25 @@ class KitchenScreen(models.Model):
         store=True
     )
     
+    # ✅ Version du contenu de l'écran : incrémentée (une fois par transaction)
+    # à chaque modification d'une commande/ligne visible sur cet écran
+    kitchen_version = fields.Integer(
+        string='Content Version',
+        readonly=True,
+        copy=False,
+        default=0,
+        help='Incremented whenever the orders displayed on this screen change'
+    )
+
+    # ✅ Dernier numéro de séquence des messages bus envoyés à l'écran
+    kitchen_event_seq = fields.Integer(
+        string='Last Event Sequence',
+        readonly=True,
+        copy=False,
+        default=0,
+        help='Sequence number of the last bus message sent to this screen'
+    )
+    
     @api.depends('name', 'pos_config_id', 'sequence')
     def _compute_display_name_custom(self):
         """Génère un nom d'affichage combiné"""
@@ -146,6 +166,8 @@ class KitchenScreen(models.Model):
                 vals['screen_code'] = screen_code[:64]  # Limiter la longueur
         
         result = super().create(vals_list)
+        self.env.registry.clear_cache()  # index de routage
+        self.env['pos.order.line']._recompute_kitchen_screens(result.pos_config_id.ids)
         
         # ✅ Log de création
         for record in result:
@@ -159,8 +181,19 @@ class KitchenScreen(models.Model):
     
     def write(self, vals):
         """Log des modifications importantes"""
+        old_config_ids = set(self.pos_config_id.ids)
         result = super().write(vals)
+        self._mark_kitchen_content_changed(self.ids)
         
+        if self._ROUTING_FIELDS.intersection(vals):
+            self.env.registry.clear_cache()  # index de routage
+
+        if {'pos_categ_ids', 'active', 'pos_config_id'}.intersection(vals):
+            # ✅ Seul cas où l'assignation stockée des lignes est recalculée
+            self.env['pos.order.line']._recompute_kitchen_screens(
+                old_config_ids | set(self.pos_config_id.ids)
+            )
+
         if 'pos_categ_ids' in vals or 'active' in vals:
             for record in self:
                 _logger.info(
@@ -169,6 +202,119 @@ class KitchenScreen(models.Model):
                 )
         
         return result
+
+    def unlink(self):
+        """Invalide l'index de routage à la suppression d'un écran"""
+        result = super().unlink()
+        self.env.registry.clear_cache()  # index de routage
+        return result
+
+    @api.model
+    def _mark_kitchen_content_changed(self, screen_ids):
+        """
+        ✅ Signale que le contenu de ces écrans a changé.
+        La version n'est incrémentée qu'une fois par transaction, juste avant le commit.
+        """
+        screen_ids = {screen_id for screen_id in screen_ids if screen_id}
+        if not screen_ids:
+            return
+
+        precommit = self.env.cr.precommit
+        pending_ids = precommit.data.get('kitchen.screen.version')
+        if pending_ids is None:
+            pending_ids = precommit.data['kitchen.screen.version'] = set()
+            precommit.add(self._flush_kitchen_versions)
+        pending_ids.update(screen_ids)
+
+    def _flush_kitchen_versions(self, event_counts=None):
+        """
+        ✅ Compteurs des écrans, en UNE instruction par transaction (precommit) :
+        version de contenu (+1 pour les écrans modifiés, sans toucher write_date)
+        et séquence des messages bus (+n événements, voir kitchen.screen.event).
+        Retourne {screen_id: (version, dernière séquence)}.
+
+        Compromis : ces compteurs doivent être croissants et sans trou (détection
+        de trou côté écran), donc transactionnels ; une séquence PostgreSQL ne
+        convient pas. Deux transactions qui touchent le même écran se sérialisent
+        sur sa ligne : le verrou n'est pris qu'au commit (precommit), et sous
+        REPEATABLE READ la seconde peut échouer en erreur de sérialisation.
+        Odoo rejoue alors les RPC ; le cron de la file remet le lot en attente.
+        Tant que des notifications sont en attente, c'est leur flush qui appelle
+        cette méthode, afin de ne faire qu'un seul UPDATE.
+        """
+        precommit = self.env.cr.precommit
+        if event_counts is None and precommit.data.get('kitchen.bus.notifications'):
+            return {}
+        event_counts = event_counts or {}
+        version_ids = precommit.data.pop('kitchen.screen.version', set())
+        screen_ids = sorted(version_ids | set(event_counts))
+        if not screen_ids:
+            return {}
+
+        self.env.cr.execute("""
+            UPDATE kitchen_screen AS screen
+               SET kitchen_version = COALESCE(screen.kitchen_version, 0)
+                                     + CASE WHEN counter.bump THEN 1 ELSE 0 END,
+                   kitchen_event_seq = COALESCE(screen.kitchen_event_seq, 0) + counter.events
+              FROM unnest(%s::int[], %s::bool[], %s::int[]) AS counter(id, bump, events)
+             WHERE screen.id = counter.id
+         RETURNING screen.id, screen.kitchen_version, screen.kitchen_event_seq
+        """, [
+            screen_ids,
+            [screen_id in version_ids for screen_id in screen_ids],
+            [event_counts.get(screen_id, 0) for screen_id in screen_ids],
+        ])
+        counters = {screen_id: (version, seq) for screen_id, version, seq in self.env.cr.fetchall()}
+        self.invalidate_model(['kitchen_version', 'kitchen_event_seq'])
+
+        if version_ids:
+            self.env['pos.order']._evict_kitchen_snapshots(version_ids)
+            # Versions attribuées dans cette transaction (deltas envoyés sur le bus)
+            precommit.data.setdefault('kitchen.screen.bumped', {}).update({
+                screen_id: counters[screen_id][0] for screen_id in version_ids if screen_id in counters
+            })
+        return counters
+
+    # Champs dont la modification change le routage catégorie → écran
+    _ROUTING_FIELDS = {'pos_categ_ids', 'active', 'pos_config_id', 'display_order'}
+
+    @api.model
+    @tools.ormcache('pos_config_id')
+    def _get_routing_index(self, pos_config_id):
+        """
+        ✅ Index de routage d'un POS, calculé une fois puis mis en cache :
+        (ids des écrans actifs par ordre d'affichage, {categ_id: (screen_id, ...)})
+        Invalidé par create / write / unlink / toggle_active des écrans.
+        """
+        screens = self.sudo().search([
+            ('pos_config_id', '=', pos_config_id),
+            ('active', '=', True)
+        ], order='display_order, id')
+
+        categ_index = {}
+        for screen in screens:
+            for categ_id in screen.pos_categ_ids.ids:
+                categ_index.setdefault(categ_id, []).append(screen.id)
+
+        return (
+            tuple(screens.ids),
+            frozendict({categ_id: tuple(ids) for categ_id, ids in categ_index.items()}),
+        )
+
+    @api.model
+    def _route_categories(self, pos_config_id, category_ids):
+        """
+        ✅ Ids des écrans actifs du POS (ordre d'affichage) gérant au moins
+        une des catégories données, résolus via l'index de routage en cache.
+        """
+        if not pos_config_id or not category_ids:
+            return []
+
+        screen_ids, categ_index = self._get_routing_index(pos_config_id)
+        matched = set()
+        for categ_id in category_ids:
+            matched.update(categ_index.get(categ_id, ()))
+        return [screen_id for screen_id in screen_ids if screen_id in matched]
     
     
     def kitchen_screen(self):
@@ -225,6 +371,59 @@ class KitchenScreen(models.Model):
             'description'
         ])
     
+    @api.model
+    def get_kitchen_bus_dictionary(self, screen_id):
+        """
+        ✅ Dictionnaire chargé une fois par l'écran cuisine pour décoder les
+        messages bus compacts (format v3) : noms des écrans, POS, tables et
+        produits référencés par id dans les messages, et schéma des deltas.
+        """
+        screen = self.sudo().browse(screen_id).exists()
+        if not screen:
+            return {'_v': 3, 'screens': {}, 'configs': {}, 'tables': {}, 'products': {}, 'delta_schema': None}
+
+        config = screen.pos_config_id
+        products = self.env['product.product'].sudo().search([
+            ('pos_categ_ids', 'in', screen.pos_categ_ids.ids),
+        ]) if screen.pos_categ_ids else self.env['product.product']
+
+        tables = {}
+        if config and 'restaurant.table' in self.env:
+            tables = {
+                table.id: table.display_name
+                for table in self.env['restaurant.table'].sudo().search([
+                    ('floor_id.pos_config_ids', 'in', config.ids),
+                ])
+            }
+
+        return {
+            '_v': 3,
+            'screens': {screen.id: screen.display_name_custom or screen.name or f"Screen {screen.id}"},
+            'configs': {config.id: config.name} if config else {},
+            'tables': tables,
+            'products': {product.id: product.display_name for product in products},
+            'delta_schema': self.env['pos.order']._get_kitchen_delta_schema(),
+        }
+
+    @api.model
+    def get_kitchen_state(self, screen_id):
+        """
+        ✅ Sonde légère pour le polling de secours : version du contenu et
+        dernière séquence bus de l'écran, sans aucune sérialisation de commande
+        """
+        screen = self.sudo().browse(screen_id).exists()
+        if not screen:
+            return {'version': None, 'seq': None}
+        return {'version': screen.kitchen_version, 'seq': screen.kitchen_event_seq}
+
+    @api.model
+    def resync(self, screen_id, from_seq):
+        """
+        ✅ Messages bus manqués par un écran depuis la séquence from_seq
+        (voir kitchen.screen.event)
+        """
+        return self.env['kitchen.screen.event']._resync(screen_id, from_seq)
+
     @api.model
     def get_screen_by_code(self, screen_code):
         """
@@ -292,44 +491,9 @@ class KitchenScreen(models.Model):
                 f"with categories {category_ids}"
             )
             
-            # ✅ CORRECTION: Récupérer TOUS les écrans actifs d'abord
-            all_screens = self.search([
-                ('pos_config_id', '=', pos_config_id),
-                ('active', '=', True)
-            ], order='display_order, id')
-
-            if not all_screens:
-                _logger.warning(f"[KITCHEN SCREEN] ⚠ No active screens found for POS {pos_config_id}")
-                return []
-
-            _logger.info(f"[KITCHEN SCREEN] Found {len(all_screens)} active screens to check")
-
-            # ✅ FILTRAGE MANUEL: Vérifier chaque écran
-            matching_screens = self.env['kitchen.screen']
-            
-            for screen in all_screens:
-                screen_categ_ids = screen.pos_categ_ids.ids
-                _logger.info(
-                    f"[KITCHEN SCREEN] Checking screen '{screen.name}' (ID: {screen.id}) "
-                    f"with categories {screen_categ_ids}"
-                )
-                
-                # Vérifier l'intersection
-                common_categories = set(category_ids) & set(screen_categ_ids)
-                
-                if common_categories:
-                    matching_screens |= screen
-                    _logger.info(
-                        f"[KITCHEN SCREEN] ✅ Screen '{screen.name}' MATCHES "
-                        f"(common categories: {list(common_categories)})"
-                    )
-                else:
-                    _logger.info(
-                        f"[KITCHEN SCREEN] ❌ Screen '{screen.name}' NO MATCH "
-                        f"(looking for {category_ids}, has {screen_categ_ids})"
-                    )
-
-            screen_ids = matching_screens.ids
+            # ✅ Résolution via l'index de routage en cache (pas de recherche)
+            screen_ids = self._route_categories(pos_config_id, category_ids)
+            matching_screens = self.browse(screen_ids)
             
             if matching_screens:
                 screen_names = matching_screens.mapped('name')
@@ -410,6 +574,7 @@ class KitchenScreen(models.Model):
         """
         ✅ NOUVELLE MÉTHODE: Basculer l'état actif/inactif rapidement
         """
+        # L'index de routage est invalidé par write() (champ active)
         for record in self:
             record.active = not record.active
             
@@ -496,14 +661,9 @@ class PosConfig(models.Model):
         if not category_ids:
             return {'valid': True, 'missing_categories': []}
         
-        screens = self.env['kitchen.screen'].search([
-            ('pos_config_id', '=', pos_config_id),
-            ('active', '=', True)
-        ])
-        
-        assigned_categs = set()
-        for screen in screens:
-            assigned_categs.update(screen.pos_categ_ids.ids)
+        # ✅ Catégories couvertes = clés de l'index de routage en cache
+        _screen_ids, categ_index = self.env['kitchen.screen']._get_routing_index(pos_config_id)
+        assigned_categs = set(categ_index)
         
         missing = set(category_ids) - assigned_categs
         
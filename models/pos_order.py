@@ -1,11 +1,50 @@
 # -*- coding: utf-8 -*-
 from odoo import api, fields, models
+from odoo.exceptions import UserError
+from odoo.tools import float_compare
+import hashlib
+import json
 import logging
 import pytz
-from datetime import datetime
+import threading
+import time
+from collections import Counter, OrderedDict, defaultdict
+from datetime import datetime, timedelta
 
 _logger = logging.getLogger(__name__)
 
+# Marge appliquée au curseur delta de get_details : couvre les transactions
+# démarrées avant la lecture précédente mais commitées après elle.
+KITCHEN_CURSOR_OVERLAP = timedelta(seconds=30)
+
+# Cache mémoire (par worker) des snapshots get_details, borné en LRU.
+# Les clés incluent kitchen.screen.kitchen_version : sûr entre workers.
+KITCHEN_SNAPSHOT_CACHE_SIZE = 64
+
+# Version du format compact des messages bus cuisine (voir _encode_kitchen_message)
+KITCHEN_BUS_SCHEMA_VERSION = 3
+
+# Relations des deltas compacts envoyées par id seul : le nom est résolu côté
+# écran (section du dictionnaire bus, ou la commande du delta pour 'order')
+KITCHEN_DELTA_REFS = {
+    'pos.config': 'configs',
+    'restaurant.table': 'tables',
+    'product.product': 'products',
+    'pos.order': 'order',
+}
+
+# Champs comparés lors du rapprochement des lignes d'une commande re-soumise
+KITCHEN_LINE_DIFF_FIELDS = (
+    'qty', 'price_unit', 'price_subtotal', 'price_subtotal_incl',
+    'discount', 'price_extra', 'note', 'full_product_name', 'name',
+)
+# Sous-ensemble qui représente du travail pour la cuisine (le produit d'une
+# ligne rapprochée ne change jamais) : seul lui remet la commande en 'draft'
+KITCHEN_LINE_WORK_FIELDS = frozenset(('qty', 'note'))
+
+_kitchen_snapshot_cache = OrderedDict()
+_kitchen_snapshot_lock = threading.Lock()
+
 
 class PosOrder(models.Model):
     _inherit = 'pos.order'
@@ -21,139 +60,22 @@ class PosOrder(models.Model):
         copy=False
     )
 
-    def _process_screen_assignment(self, target_screen_ids=None):
-        """
-        ✅ CORRIGÉE: Assignation directe sans filtrage préalable
-        """
-        try:
-            _logger.info(f"[KITCHEN] 🎯 ==========================================")
-            _logger.info(f"[KITCHEN] 🎯 Starting screen assignment for order {self.name}")
-            
-            # ✅ Si écrans cibles spécifiés, ASSIGNER DIRECTEMENT
-            if target_screen_ids:
-                _logger.info(f"[KITCHEN] 📌 Target screens provided: {target_screen_ids}")
-                
-                screens_to_check = self.env["kitchen.screen"].sudo().browse(target_screen_ids)
-                screens_to_check = screens_to_check.filtered(lambda s: s.exists() and s.active)
-                
-                if not screens_to_check:
-                    _logger.error(f"[KITCHEN] ❌ No valid screens in target list: {target_screen_ids}")
-                    return False
-                
-                valid_screen_ids = screens_to_check.ids
-                screen_names = screens_to_check.mapped('name')
-                
-                _logger.info(
-                    f"[KITCHEN] 🎯 Assigning {len(valid_screen_ids)} screens directly: "
-                    f"{screen_names} (IDs: {valid_screen_ids})"
-                )
-                
-                # ✅ ASSIGNATION DIRECTE
-                self.sudo().write({'screen_ids': [(6, 0, valid_screen_ids)]})
-                
-                # ✅ Validation immédiate
-                self.invalidate_cache(['screen_ids'])
-                actual_screens = self.screen_ids.ids
-                
-                _logger.info(
-                    f"[KITCHEN] ✅ Assignment complete. Verification: {actual_screens}"
-                )
-                
-                if actual_screens != valid_screen_ids:
-                    _logger.error(
-                        f"[KITCHEN] ❌ Assignment MISMATCH! "
-                        f"Expected: {valid_screen_ids}, Got: {actual_screens}"
-                    )
-                    return False
-                
-                _logger.info(f"[KITCHEN] 🎯 ==========================================")
-                return True
-                            
-            # ✅ Détection automatique (fallback)
-            kitchen_lines = self.lines.filtered(lambda l: l.is_cooking)
-            if not kitchen_lines:
-                _logger.warning(f"[KITCHEN] ⚠ Order {self.name} has no kitchen lines")
-                return False
-
-            all_categ_ids = set()
-            for line in kitchen_lines:
-                if line.product_id and line.product_id.pos_categ_ids:
-                    line_categs = line.product_id.pos_categ_ids.ids
-                    all_categ_ids.update(line_categs)
-            
-            if not all_categ_ids:
-                _logger.warning(f"[KITCHEN] ⚠ Order {self.name} has no POS categories")
-                return False
-
-            all_categ_list = list(all_categ_ids)
-            _logger.info(f"[KITCHEN] 📋 Order {self.name} categories: {all_categ_list}")
-
-            kitchen_screens = self.env["kitchen.screen"].sudo().search([
-                ("pos_config_id", "=", self.config_id.id),
-                ("active", "=", True)
-            ])
-
-            if not kitchen_screens:
-                _logger.warning(f"[KITCHEN] ⚠ No active screens for POS {self.config_id.name}")
-                return False
-
-            matching_screens = []
-            for screen in kitchen_screens:
-                screen_categ_ids = set(screen.pos_categ_ids.ids)
-                common_categs = all_categ_ids & screen_categ_ids
-                
-                if common_categs:
-                    matching_screens.append(screen)
-
-            if not matching_screens:
-                _logger.error(
-                    f"[KITCHEN] ❌ No screens match order categories {all_categ_list}"
-                )
-                return False
-
-            screen_ids = [screen.id for screen in matching_screens]
-            screen_names = [screen.name for screen in matching_screens]
-            
-            _logger.info(
-                f"[KITCHEN] 🎯 Auto-assigning {len(matching_screens)} screens: "
-                f"{screen_names} (IDs: {screen_ids})"
-            )
-            
-            self.sudo().write({'screen_ids': [(6, 0, screen_ids)]})
-            self.invalidate_cache(['screen_ids'])
-            
-            assigned_count = len(self.screen_ids)
-            if assigned_count == 0:
-                _logger.error(f"[KITCHEN] ❌ Assignment failed!")
-                return False
-            
-            _logger.info(f"[KITCHEN] ✅ Assignment successful: {assigned_count} screens")
-            _logger.info(f"[KITCHEN] ==========================================")
-            
-            return True
-
-        except Exception as e:
-            _logger.error(
-                f"[KITCHEN] ❌ CRITICAL ERROR in screen assignment for {self.name}: {str(e)}", 
-                exc_info=True
-            )
-            return False
-
+    # ✅ Empreinte du dernier payload POS accepté : les re-soumissions
+    # identiques (double clic, retry réseau) sont ignorées
+    kitchen_payload_hash = fields.Char(
+        string='Kitchen Payload Fingerprint',
+        copy=False,
+        readonly=True
+    )
 
     def _get_visible_lines_for_screen(self, order, kitchen_screen):
         """Récupère les lignes visibles pour un écran spécifique"""
         try:
-            screen_categ_ids = kitchen_screen.pos_categ_ids.ids
             visible_lines = self.env['pos.order.line']
             
             for line in order.lines.filtered(lambda l: l.is_cooking):
-                if not line.product_id:
-                    continue
-                    
-                product_categ_ids = line.product_id.pos_categ_ids.ids
-                
-                # Vérifier l'intersection avec les catégories de l'écran
-                if set(product_categ_ids) & set(screen_categ_ids):
+                # Assignation stockée ligne → écrans
+                if kitchen_screen in line.kitchen_screen_ids:
                     visible_lines |= line
                     _logger.debug(
                         f"[KITCHEN] ✓ Line {line.id} ({line.product_id.name}) "
@@ -171,16 +93,9 @@ class PosOrder(models.Model):
     def _should_order_be_on_screen(self, order, kitchen_screen):
         """Détermine si une commande devrait être sur cet écran"""
         try:
-            screen_categ_ids = kitchen_screen.pos_categ_ids.ids
-            
             for line in order.lines.filtered(lambda l: l.is_cooking):
-                if not line.product_id:
-                    continue
-                    
-                product_categ_ids = line.product_id.pos_categ_ids.ids
-                
-                # Si au moins une ligne correspond aux catégories de l'écran
-                if set(product_categ_ids) & set(screen_categ_ids):
+                # Si au moins une ligne est assignée à cet écran
+                if kitchen_screen in line.kitchen_screen_ids:
                     return True
                     
             return False
@@ -191,36 +106,48 @@ class PosOrder(models.Model):
 
     
     
-    def _send_instant_notifications(self, order, screen_ids):
+    @api.model
+    def _assign_screens_bulk(self, target_screen_ids_by_order):
         """
-        ✅ NOUVELLE : Envoie des notifications instantanées aux écrans
+        ✅ Assignation des écrans de plusieurs commandes en quelques écritures.
+        Écrans cibles valides si fournis, sinon écrans routés des lignes cuisine.
+        Retourne {order_id: [screen_id, ...]} pour les commandes assignées.
         """
-        try:
-            _logger.info(f"[KITCHEN] 🔔 Sending instant notifications for {order.name}")
-            
-            screens = self.env['kitchen.screen'].sudo().browse(screen_ids)
-            screens = screens.filtered(lambda s: s.exists())
-            
-            for screen in screens:
-                # Vérifier que l'écran a des lignes visibles
-                visible_lines = self._get_visible_lines_for_screen(order, screen)
-                if visible_lines:
-                    self._send_new_order_notification(screen, order)
-                    _logger.info(
-                        f"[KITCHEN] ✅ Notification sent to '{screen.name}' "
-                        f"({len(visible_lines)} lines)"
-                    )
-                else:
-                    _logger.warning(
-                        f"[KITCHEN] ⚠ Skipped notification to '{screen.name}' "
-                        f"(no visible lines)"
-                    )
-            
-            _logger.info(f"[KITCHEN] 🔔 Instant notifications completed")
-            
-        except Exception as e:
-            _logger.error(f"[KITCHEN] ❌ Error in instant notifications: {str(e)}", exc_info=True)
+        all_target_ids = {
+            sid for sids in target_screen_ids_by_order.values() for sid in (sids or [])
+        }
+        active_target_ids = set(
+            self.env['kitchen.screen'].sudo().browse(all_target_ids).exists()
+            .filtered(lambda s: s.active).ids
+        )
+
+        orders = self.sudo().browse(list(target_screen_ids_by_order)).exists()
+        assignments = {}
+        for order in orders:
+            screen_ids = [
+                sid for sid in (target_screen_ids_by_order[order.id] or [])
+                if sid in active_target_ids
+            ]
+            if not screen_ids:
+                # ✅ Fallback : écrans déjà routés sur les lignes
+                screen_ids = order.lines.filtered('is_cooking').kitchen_screen_ids.ids
+            if not screen_ids:
+                _logger.error(f"[KITCHEN] ❌ No screen found for order {order.name}")
+                continue
+            assignments[order.id] = sorted(set(screen_ids))
 
+        # ✅ Une écriture par ensemble d'écrans distinct
+        orders_by_target = defaultdict(list)
+        for order_id, screen_ids in assignments.items():
+            orders_by_target[tuple(screen_ids)].append(order_id)
+        for screen_ids, order_ids in orders_by_target.items():
+            self.sudo().browse(order_ids).write({'screen_ids': [(6, 0, list(screen_ids))]})
+
+        _logger.info(
+            f"[KITCHEN] 🎯 Bulk assignment: {len(assignments)} orders, "
+            f"{len(orders_by_target)} writes"
+        )
+        return assignments
 
     @api.model_create_multi
     def create(self, vals_list):
@@ -229,6 +156,7 @@ class PosOrder(models.Model):
         L'assignation sera faite UNIQUEMENT par create_or_update_kitchen_order
         """
         res = super().create(vals_list)
+        self.env['kitchen.screen']._mark_kitchen_content_changed(res.screen_ids.ids)
 
         for order in res:
             try:
@@ -252,140 +180,201 @@ class PosOrder(models.Model):
         return res
     
    
-    def _create_kitchen_order(self, order_data):
+    @api.model
+    def _kitchen_payload_fingerprint(self, order_data):
+        """Empreinte stable (sha1 du JSON trié) d'un payload de commande POS"""
+        normalized = json.dumps(order_data, sort_keys=True, default=str, separators=(',', ':'))
+        return hashlib.sha1(normalized.encode('utf-8')).hexdigest()
+
+    @api.model
+    def _extract_kitchen_product_ids(self, orders_data):
+        """Ids produits de toutes les lignes (0, 0, vals) des payloads POS"""
+        product_ids = set()
+        for order_data in orders_data:
+            for line_data in order_data.get('lines', []):
+                if isinstance(line_data, (list, tuple)) and len(line_data) >= 3:
+                    product_id = line_data[2].get('product_id')
+                    if product_id:
+                        product_ids.add(product_id)
+        return product_ids
+
+    @api.model
+    def _get_kitchen_product_cache(self, product_ids):
         """
-        ✅ SIMPLIFIÉE : Crée UNIQUEMENT la commande, SANS assignation d'écrans
-        L'assignation sera faite par create_or_update_kitchen_order
+        ✅ Résout des produits en une fois : un exists() et une lecture groupée.
+        Retourne {product_id: {'display_name': ..., 'pos_categ_ids': [...]}}
+        réutilisé pour la préparation des lignes, le routage et les notifications.
         """
-        try:
-            _logger.info(f"[KITCHEN] 🆕 ==========================================")
-            _logger.info(f"[KITCHEN] 🆕 START _create_kitchen_order for {order_data.get('pos_reference')}")
-            
-            # ✅ VALIDATION des données critiques
-            pos_reference = order_data.get('pos_reference')
-            config_id = order_data.get('config_id')
-            session_id = order_data.get('session_id')
-            
-            if not all([pos_reference, config_id, session_id]):
-                _logger.error(
-                    f"[KITCHEN] ❌ Missing critical data: "
-                    f"pos_reference={pos_reference}, config_id={config_id}, session_id={session_id}"
-                )
-                return None
+        products = self.env['product.product'].sudo().browse(list(product_ids)).exists()
+        return {
+            product['id']: {
+                'display_name': product['display_name'],
+                'pos_categ_ids': product['pos_categ_ids'],
+            }
+            for product in products.read(['display_name', 'pos_categ_ids'])
+        }
 
-            # Validation des enregistrements
-            config = self.env['pos.config'].browse(config_id)
-            if not config.exists():
-                _logger.error(f"[KITCHEN] ❌ POS config {config_id} does not exist")
-                return None
+    def _prepare_kitchen_line_vals(self, line_data, config_id, product_cache=None):
+        """
+        ✅ Valeurs de création d'une ligne cuisine à partir de la commande (0, 0, vals) du POS.
+        Retourne None si la ligne est invalide.
+        ``product_cache`` : résultat de _get_kitchen_product_cache (évite une requête par ligne).
+        """
+        if not isinstance(line_data, (list, tuple)) or len(line_data) < 3:
+            return None
+        line_vals = line_data[2]
 
-            session = self.env['pos.session'].browse(session_id)
-            if not session.exists():
-                _logger.error(f"[KITCHEN] ❌ POS session {session_id} does not exist")
-                return None
+        product_id = line_vals.get('product_id')
+        if not product_id:
+            _logger.warning(f"[KITCHEN] ⚠ Line missing product_id")
+            return None
 
-            lines_data = order_data.get('lines', [])
-            if not lines_data:
-                _logger.error(f"[KITCHEN] ❌ No lines data provided")
-                return None
-
-            _logger.info(f"[KITCHEN] 📋 Creating kitchen order with {len(lines_data)} lines")
-
-            # ✅ Construction des valeurs de commande
-            order_vals = {
-                'pos_reference': pos_reference,
-                'session_id': session_id,
-                'config_id': config_id,
-                'amount_total': order_data.get('amount_total', 0.0),
-                'amount_paid': order_data.get('amount_paid', 0.0),
-                'amount_return': order_data.get('amount_return', 0.0),
-                'amount_tax': order_data.get('amount_tax', 0.0),
-                'date_order': order_data.get('date_order', fields.Datetime.now()),
-                'is_cooking': True,
-                'order_status': 'draft',
-                'table_id': order_data.get('table_id'),
-                'lines': [],
-                # ✅ PAS d'assignation d'écrans ici !
-            }
+        if product_cache is None:
+            product_cache = self._get_kitchen_product_cache([product_id])
+        product = product_cache.get(product_id)
+        if not product:
+            _logger.warning(f"[KITCHEN] ⚠ Product {product_id} does not exist")
+            return None
 
-            # ✅ Traitement des lignes
-            valid_lines_count = 0
-            for line_index, line_data in enumerate(lines_data):
-                try:
-                    if isinstance(line_data, (list, tuple)) and len(line_data) >= 3:
-                        line_vals = line_data[2]
-                        
-                        product_id = line_vals.get('product_id')
-                        if not product_id:
-                            _logger.warning(f"[KITCHEN] ⚠ Line {line_index} missing product_id")
-                            continue
-
-                        product = self.env['product.product'].browse(product_id)
-                        if not product.exists():
-                            _logger.warning(f"[KITCHEN] ⚠ Product {product_id} does not exist")
-                            continue
-
-                        line_creation_vals = {
-                            'product_id': product_id,
-                            'qty': float(line_vals.get('qty', 1)),
-                            'price_unit': float(line_vals.get('price_unit', 0)),
-                            'price_subtotal': float(line_vals.get('price_subtotal', 0)),
-                            'price_subtotal_incl': float(line_vals.get('price_subtotal_incl', 0)),
-                            'discount': float(line_vals.get('discount', 0)),
-                            'is_cooking': True,
-                            'name': line_vals.get('full_product_name') or product.display_name,
-                            'full_product_name': line_vals.get('full_product_name') or product.display_name,
-                            'note': line_vals.get('note', ''),
-                            'price_extra': float(line_vals.get('price_extra', 0)),
-                        }
-
-                        if line_vals.get('tax_ids'):
-                            tax_data = line_vals['tax_ids']
-                            if isinstance(tax_data, list) and len(tax_data) > 0:
-                                if isinstance(tax_data[0], (list, tuple)) and len(tax_data[0]) >= 3:
-                                    tax_ids = tax_data[0][2]
-                                else:
-                                    tax_ids = tax_data
-                                line_creation_vals['tax_ids'] = [(6, 0, tax_ids)]
-
-                        order_vals['lines'].append((0, 0, line_creation_vals))
-                        valid_lines_count += 1
+        line_creation_vals = {
+            'product_id': product_id,
+            'qty': float(line_vals.get('qty', 1)),
+            'price_unit': float(line_vals.get('price_unit', 0)),
+            'price_subtotal': float(line_vals.get('price_subtotal', 0)),
+            'price_subtotal_incl': float(line_vals.get('price_subtotal_incl', 0)),
+            'discount': float(line_vals.get('discount', 0)),
+            'is_cooking': True,
+            'name': line_vals.get('full_product_name') or product['display_name'],
+            'full_product_name': line_vals.get('full_product_name') or product['display_name'],
+            'note': line_vals.get('note', ''),
+            'price_extra': float(line_vals.get('price_extra', 0)),
+            'kitchen_line_ref': str(line_vals.get('uuid') or line_vals.get('id') or '') or False,
+            # ✅ Assignation ligne → écrans stockée à la création
+            'kitchen_screen_ids': [(6, 0, self.env['kitchen.screen']._route_categories(
+                config_id, product['pos_categ_ids']
+            ))],
+            'kitchen_routed': True,
+        }
+
+        if line_vals.get('tax_ids'):
+            tax_data = line_vals['tax_ids']
+            if isinstance(tax_data, list) and len(tax_data) > 0:
+                if isinstance(tax_data[0], (list, tuple)) and len(tax_data[0]) >= 3:
+                    tax_ids = tax_data[0][2]
+                else:
+                    tax_ids = tax_data
+                line_creation_vals['tax_ids'] = [(6, 0, tax_ids)]
 
-                except Exception as line_error:
-                    _logger.error(f"[KITCHEN] ❌ Error processing line {line_index}: {line_error}")
-                    continue
+        return line_creation_vals
 
-            if valid_lines_count == 0:
-                _logger.error(f"[KITCHEN] ❌ No valid lines to create order")
-                return None
+    def _prepare_kitchen_order_vals(self, order_data, product_cache=None):
+        """
+        ✅ Valeurs de création d'une commande cuisine (sans écrans).
+        Retourne None si aucune ligne n'est valide.
+        """
+        lines_data = order_data.get('lines', [])
+        if not lines_data:
+            _logger.error(f"[KITCHEN] ❌ No lines data provided")
+            return None
 
-            # ✅ CRÉATION DE LA COMMANDE (sans écrans)
+        _logger.info(f"[KITCHEN] 📋 Preparing kitchen order with {len(lines_data)} lines")
+
+        config_id = order_data.get('config_id')
+        if product_cache is None:
+            product_cache = self._get_kitchen_product_cache(self._extract_kitchen_product_ids([order_data]))
+        order_vals = {
+            'pos_reference': order_data.get('pos_reference'),
+            'session_id': order_data.get('session_id'),
+            'config_id': config_id,
+            'amount_total': order_data.get('amount_total', 0.0),
+            'amount_paid': order_data.get('amount_paid', 0.0),
+            'amount_return': order_data.get('amount_return', 0.0),
+            'amount_tax': order_data.get('amount_tax', 0.0),
+            'date_order': order_data.get('date_order', fields.Datetime.now()),
+            'is_cooking': True,
+            'order_status': 'draft',
+            'table_id': order_data.get('table_id'),
+            'lines': [],
+            'kitchen_payload_hash': self._kitchen_payload_fingerprint(order_data),
+            # ✅ PAS d'assignation d'écrans ici !
+        }
+
+        for line_index, line_data in enumerate(lines_data):
             try:
-                order = self.sudo().create(order_vals)
-                _logger.info(
-                    f"[KITCHEN] 🎉 Order created: {order.name} (ID: {order.id}) "
-                    f"with {valid_lines_count} lines"
-                )
-            except Exception as create_error:
-                _logger.error(f"[KITCHEN] ❌ Order creation failed: {create_error}")
-                return None
-
-            # ✅ RETOUR de la commande (l'assignation se fera dans create_or_update_kitchen_order)
-            _logger.info(f"[KITCHEN] ✅ _create_kitchen_order completed for {order.name}")
-            _logger.info(f"[KITCHEN] ==========================================")
-
-            return order
+                line_creation_vals = self._prepare_kitchen_line_vals(line_data, config_id, product_cache)
+                if line_creation_vals:
+                    order_vals['lines'].append((0, 0, line_creation_vals))
+            except Exception as line_error:
+                _logger.error(f"[KITCHEN] ❌ Error processing line {line_index}: {line_error}")
+                continue
 
-        except Exception as e:
-            _logger.error(
-                f"[KITCHEN] ❌ CRITICAL ERROR in _create_kitchen_order: {str(e)}", 
-                exc_info=True
-            )
+        if not order_vals['lines']:
+            _logger.error(f"[KITCHEN] ❌ No valid lines to create order")
             return None
 
+        return order_vals
 
-    
-    def _update_kitchen_order(self, order, order_data):
+    @api.model
+    def _diff_kitchen_lines(self, existing_lines, incoming_vals):
+        """
+        ✅ Rapproche les lignes reçues des lignes cuisine existantes
+        (par référence POS, sinon par produit + note) et retourne les
+        commandes x2many minimales : (0, 0, vals), (1, id, changes), (2, id).
+        Les lignes rapprochées conservent leur id et leurs écrans ; leur statut
+        repasse en 'draft' seulement si la quantité ou la note change.
+        """
+        by_ref = {}
+        by_product_note = defaultdict(list)
+        for line in existing_lines:
+            if line.kitchen_line_ref:
+                by_ref.setdefault(line.kitchen_line_ref, line)
+            by_product_note[(line.product_id.id, line.note or '')].append(line)
+
+        matched_ids = set()
+        commands = []
+        for vals in incoming_vals:
+            line = by_ref.get(vals.get('kitchen_line_ref'))
+            if line is None or line.id in matched_ids or line.product_id.id != vals['product_id']:
+                candidates = by_product_note.get((vals['product_id'], vals.get('note') or ''), [])
+                line = next((l for l in candidates if l.id not in matched_ids), None)
+
+            if line is None:
+                commands.append((0, 0, vals))
+                continue
+
+            matched_ids.add(line.id)
+            changes = {
+                field_name: vals[field_name]
+                for field_name in KITCHEN_LINE_DIFF_FIELDS
+                if field_name in vals and self._kitchen_line_value_differs(line, field_name, vals[field_name])
+            }
+            if KITCHEN_LINE_WORK_FIELDS.intersection(changes):
+                # Quantité ou note modifiée : la ligne est à (re)préparer
+                changes['order_status'] = 'draft'
+            if vals.get('kitchen_line_ref') and line.kitchen_line_ref != vals['kitchen_line_ref']:
+                changes['kitchen_line_ref'] = vals['kitchen_line_ref']
+            if changes:
+                commands.append((1, line.id, changes))
+
+        commands.extend((2, line.id) for line in existing_lines if line.id not in matched_ids)
+        return commands
+
+    def _kitchen_line_value_differs(self, line, field_name, value):
+        """Compare une valeur reçue à la valeur stockée (flottants à la précision du champ)"""
+        field = line._fields[field_name]
+        current = line[field_name]
+        if field.type == 'float':
+            digits = field.get_digits(self.env)
+            precision = digits[1] if digits else 6
+            return float_compare(current or 0.0, value or 0.0, precision_digits=precision) != 0
+        if field.type == 'monetary':
+            precision = line.order_id.currency_id.decimal_places or 2
+            return float_compare(current or 0.0, value or 0.0, precision_digits=precision) != 0
+        if field_name == 'note':
+            return (current or '') != (value or '')
+        return current != value
+
+    def _update_kitchen_order(self, order, order_data, product_cache=None):
         """
         ✅ SIMPLIFIÉE : Met à jour UNIQUEMENT les lignes, SANS réassignation d'écrans
         La réassignation sera faite par create_or_update_kitchen_order
@@ -411,83 +400,55 @@ class PosOrder(models.Model):
                 _logger.warning(f"[KITCHEN] ⚠ No lines data for update")
                 return False
 
-            # ✅ Suppression des anciennes lignes de cuisine
-            try:
-                if current_cooking_lines:
-                    removed_line_ids = current_cooking_lines.ids
-                    current_cooking_lines.sudo().unlink()
-                    _logger.info(f"[KITCHEN] 🗑️ Removed {len(removed_line_ids)} cooking lines")
-            except Exception as delete_error:
-                _logger.error(f"[KITCHEN] ❌ Error removing old lines: {delete_error}")
-                return False
-
-            # ✅ Création des nouvelles lignes
-            new_lines = []
-            valid_lines_count = 0
-            
+            # ✅ Préparation des lignes reçues
+            config_id = order.config_id.id
+            if product_cache is None:
+                product_cache = self._get_kitchen_product_cache(self._extract_kitchen_product_ids([order_data]))
+            incoming_vals = []
             for line_index, line_data in enumerate(lines_data):
                 try:
-                    if isinstance(line_data, (list, tuple)) and len(line_data) >= 3:
-                        line_vals = line_data[2]
-                        
-                        product_id = line_vals.get('product_id')
-                        if not product_id:
-                            continue
-
-                        product = self.env['product.product'].browse(product_id)
-                        if not product.exists():
-                            continue
-
-                        line_creation_vals = {
-                            'product_id': product_id,
-                            'qty': float(line_vals.get('qty', 1)),
-                            'price_unit': float(line_vals.get('price_unit', 0)),
-                            'price_subtotal': float(line_vals.get('price_subtotal', 0)),
-                            'price_subtotal_incl': float(line_vals.get('price_subtotal_incl', 0)),
-                            'discount': float(line_vals.get('discount', 0)),
-                            'is_cooking': True,
-                            'name': line_vals.get('full_product_name') or product.display_name,
-                            'full_product_name': line_vals.get('full_product_name') or product.display_name,
-                            'note': line_vals.get('note', ''),
-                            'price_extra': float(line_vals.get('price_extra', 0)),
-                        }
-
-                        if line_vals.get('tax_ids'):
-                            tax_data = line_vals['tax_ids']
-                            if isinstance(tax_data, list) and len(tax_data) > 0:
-                                if isinstance(tax_data[0], (list, tuple)) and len(tax_data[0]) >= 3:
-                                    tax_ids = tax_data[0][2]
-                                else:
-                                    tax_ids = tax_data
-                                line_creation_vals['tax_ids'] = [(6, 0, tax_ids)]
-
-                        new_lines.append((0, 0, line_creation_vals))
-                        valid_lines_count += 1
-
+                    line_creation_vals = self._prepare_kitchen_line_vals(line_data, config_id, product_cache)
+                    if line_creation_vals:
+                        incoming_vals.append(line_creation_vals)
                 except Exception as line_error:
                     _logger.error(f"[KITCHEN] ❌ Error processing update line {line_index}: {line_error}")
                     continue
 
-            if valid_lines_count == 0:
+            if not incoming_vals:
                 _logger.error(f"[KITCHEN] ❌ No valid lines to update")
                 return False
 
+            # ✅ Diff : seules les lignes ajoutées / modifiées / supprimées sont écrites
+            line_commands = self._diff_kitchen_lines(current_cooking_lines, incoming_vals)
+            added = sum(1 for command in line_commands if command[0] == 0)
+            updated = sum(1 for command in line_commands if command[0] == 1)
+            # Lignes dont la quantité ou la note a changé (pas les prix seuls)
+            reworked = sum(
+                1 for command in line_commands
+                if command[0] == 1 and KITCHEN_LINE_WORK_FIELDS.intersection(command[2])
+            )
+            removed = sum(1 for command in line_commands if command[0] == 2)
+
             # ✅ Mise à jour de la commande
             try:
                 update_vals = {
-                    'lines': new_lines,
                     'is_cooking': True,
-                    'order_status': 'draft',
                     'amount_total': order_data.get('amount_total', order.amount_total),
                     'amount_paid': order_data.get('amount_paid', order.amount_paid),
                     'amount_return': order_data.get('amount_return', order.amount_return),
                     'amount_tax': order_data.get('amount_tax', order.amount_tax),
+                    'kitchen_payload_hash': self._kitchen_payload_fingerprint(order_data),
                     # ✅ PAS de réassignation d'écrans ici !
                 }
+                if line_commands:
+                    update_vals['lines'] = line_commands
+                if added or reworked:
+                    # Nouveau travail pour la cuisine
+                    update_vals['order_status'] = 'draft'
                 
                 order.sudo().write(update_vals)
                 _logger.info(
-                    f"[KITCHEN] ✅ Order updated with {valid_lines_count} new lines "
+                    f"[KITCHEN] ✅ Order updated: +{added} / ~{updated} / -{removed} lines "
                     f"(was {current_line_count})"
                 )
                 
@@ -511,142 +472,483 @@ class PosOrder(models.Model):
 
 
     @api.model
-    def create_or_update_kitchen_order(self, orders_data):
-            """
-            ✅ CORRIGÉE : Assignation unique et fiable avec commits explicites
-            """
-            _logger.info(f"[KITCHEN] 📥 ==========================================")
-            _logger.info(f"[KITCHEN] 📥 create_or_update_kitchen_order called with {len(orders_data)} orders")
-            
+    def _create_kitchen_orders_isolated(self, keys, vals_list):
+        """
+        ✅ Crée les commandes en un seul create() dans un savepoint.
+        En cas d'échec, repli commande par commande (un savepoint chacune)
+        pour que seule la commande fautive soit perdue.
+        Retourne {key: order_id}.
+        """
+        try:
+            with self.env.cr.savepoint():
+                new_orders = self.sudo().create(vals_list)
+            _logger.info(f"[KITCHEN] 🎉 {len(new_orders)} orders created in batch")
+            return dict(zip(keys, new_orders.ids))
+        except Exception as batch_error:
+            _logger.warning(
+                f"[KITCHEN] ⚠ Batch creation failed ({batch_error}), retrying order by order"
+            )
+
+        created = {}
+        for key, order_vals in zip(keys, vals_list):
             try:
-                results = []
-                
-                for order_data in orders_data:
-                    order = None
-                    try:
-                        pos_reference = order_data.get('pos_reference')
-                        config_id = order_data.get('config_id')
-                        target_screen_ids = order_data.get('target_screen_ids', [])
-                        
-                        if not pos_reference or not config_id:
-                            _logger.error(f"[KITCHEN] ❌ Missing critical data in order")
-                            continue
-
-                        _logger.info(f"[KITCHEN] 🔍 Processing order {pos_reference}")
-                        _logger.info(f"[KITCHEN] 🎯 Target screens: {target_screen_ids}")
-                        
-                        # ✅ ÉTAPE 1 : Recherche
-                        order = self.sudo().search([
-                            ('pos_reference', '=', pos_reference),
-                            ('config_id', '=', config_id)
-                        ], limit=1)
-                        
-                        # ✅ ÉTAPE 2 : Créer OU Mettre à jour
-                        if order:
-                            _logger.info(f"[KITCHEN] 📋 Updating existing order: {order.name}")
-                            success = self._update_kitchen_order(order, order_data)
-                            if not success:
-                                _logger.error(f"[KITCHEN] ❌ Update failed for {order.name}")
-                                continue
-                        else:
-                            _logger.info(f"[KITCHEN] 🆕 Creating new kitchen order")
-                            order = self._create_kitchen_order(order_data)
-                            if not order or not order.exists():
-                                _logger.error(f"[KITCHEN] ❌ Creation failed")
-                                continue
-                        
-                        # ✅ ÉTAPE 3 : COMMIT INTERMÉDIAIRE pour sécuriser la commande
-                        _logger.info(f"[KITCHEN] 💾 Committing order to database...")
-                        self.env.cr.commit()
-                        
-                        # ✅ ÉTAPE 4 : Nettoyer les anciennes assignations
-                        if order.screen_ids:
-                            old_screens = order.screen_ids.ids
-                            _logger.info(f"[KITCHEN] 🗑️ Clearing old screens: {old_screens}")
-                            order.sudo().write({'screen_ids': [(5, 0, 0)]})
-                            self.env.cr.commit()
-                        
-                        # ✅ ÉTAPE 5 : Assigner les écrans
-                        _logger.info(f"[KITCHEN] 🎯 Screen assignment for {order.name}")
-                        
-                        assignment_success = order.sudo()._process_screen_assignment(
-                            target_screen_ids=target_screen_ids
-                        )
-                        
-                        if not assignment_success:
-                            _logger.error(f"[KITCHEN] ❌ Screen assignment FAILED for {order.name}")
-                            continue
-                        
-                        # ✅ ÉTAPE 6 : COMMIT FINAL
-                        _logger.info(f"[KITCHEN] 💾 Final commit...")
-                        self.env.cr.commit()
-                        
-                        # ✅ ÉTAPE 7 : Validation
-                        order.invalidate_cache()
-                        self.env.invalidate_all()
-                        
-                        # ✅ Re-charger la commande pour vérifier
-                        order = self.sudo().browse(order.id)
-                        assigned_screen_ids = order.screen_ids.ids
-                        assigned_screen_names = order.screen_ids.mapped('name')
-                        
-                        _logger.info(
-                            f"[KITCHEN] ✅ Order {order.name} FINAL STATE: "
-                            f"{len(assigned_screen_ids)} screens: {assigned_screen_names} "
-                            f"(IDs: {assigned_screen_ids})"
-                        )
-                        
-                        if not assigned_screen_ids:
-                            _logger.error(f"[KITCHEN] ❌ NO SCREENS ASSIGNED after commit!")
-                            continue
-                        
-                        # ✅ ÉTAPE 8 : Notifications
-                        if assigned_screen_ids:
-                            _logger.info(f"[KITCHEN] 🔔 Sending notifications...")
-                            
-                            for screen_id in assigned_screen_ids:
-                                try:
-                                    screen = self.env['kitchen.screen'].sudo().browse(screen_id)
-                                    if screen.exists():
-                                        self._send_new_order_notification(screen, order)
-                                        _logger.info(
-                                            f"[KITCHEN] ✅ Notification sent to '{screen.name}'"
-                                        )
-                                except Exception as notif_error:
-                                    _logger.error(
-                                        f"[KITCHEN] ❌ Notification error for screen {screen_id}: "
-                                        f"{notif_error}"
-                                    )
-                        
-                        results.append(order.id)
-                        
-                        _logger.info(f"[KITCHEN] ✅ Order {order.name} COMPLETE")
-                        _logger.info(f"[KITCHEN] ==========================================\n")
-                        
-                    except Exception as order_error:
+                with self.env.cr.savepoint():
+                    created[key] = self.sudo().create(order_vals).id
+            except Exception as create_error:
+                _logger.error(f"[KITCHEN] ❌ Order creation failed for {key[0]}: {create_error}")
+        return created
+
+    @api.model
+    def create_or_update_kitchen_order(self, orders_data):
+        """
+        ✅ Ingestion par lot des commandes cuisine envoyées par le POS :
+        une recherche pour toutes les références, un create() multi,
+        une assignation groupée des écrans et une seule passe de notifications.
+        Chaque commande est isolée par un savepoint : une erreur n'annule que
+        la commande fautive ; une erreur d'assignation annule tout le lot
+        (qui peut alors être renvoyé tel quel).
+        Un payload identique au dernier accepté (kitchen_payload_hash) est ignoré.
+        """
+        _logger.info(f"[KITCHEN] 📥 ==========================================")
+        _logger.info(f"[KITCHEN] 📥 create_or_update_kitchen_order called with {len(orders_data)} orders")
+
+        try:
+            # ✅ ÉTAPE 1 : Validation et dédoublonnage (la dernière version d'une commande l'emporte)
+            payloads = {}
+            for order_data in orders_data:
+                pos_reference = order_data.get('pos_reference')
+                config_id = order_data.get('config_id')
+                if not pos_reference or not config_id:
+                    _logger.error(f"[KITCHEN] ❌ Missing critical data in order")
+                    continue
+                payloads.pop((pos_reference, config_id), None)
+                payloads[(pos_reference, config_id)] = order_data
+
+            if not payloads:
+                return []
+
+            # ✅ ÉTAPE 2 : Recherche de toutes les références en une requête
+            existing_orders = self.sudo().search([
+                ('pos_reference', 'in', list({ref for ref, _config in payloads})),
+                ('config_id', 'in', list({config for _ref, config in payloads})),
+            ])
+            existing_by_key = {}
+            for order in existing_orders:
+                existing_by_key.setdefault((order.pos_reference, order.config_id.id), order)
+
+            valid_config_ids = set(
+                self.env['pos.config'].browse({config for _ref, config in payloads}).exists().ids
+            )
+            valid_session_ids = set(self.env['pos.session'].browse({
+                data.get('session_id') for data in payloads.values() if data.get('session_id')
+            }).exists().ids)
+
+            # ✅ Tous les produits du lot : un exists() et une lecture groupée
+            product_cache = self._get_kitchen_product_cache(
+                self._extract_kitchen_product_ids(payloads.values())
+            )
+
+            # ✅ Étapes 3 à 5 dans un savepoint : si l'assignation échoue, les
+            # commandes créées et leur kitchen_payload_hash sont annulées, sinon
+            # le renvoi du caissier serait ignoré comme doublon
+            with self.env.cr.savepoint():
+                # ✅ ÉTAPE 3 : Mises à jour des commandes existantes (un savepoint par commande)
+                order_ids_by_key = {}
+                unchanged_ids = set()
+                create_keys, create_vals_list = [], []
+                for key, order_data in payloads.items():
+                    order = existing_by_key.get(key)
+                    if order and order.kitchen_payload_hash == self._kitchen_payload_fingerprint(order_data):
+                        # ✅ Payload identique au dernier accepté : rien à écrire ni à notifier
+                        _logger.info(f"[KITCHEN] ♻️ Duplicate submission ignored for {order.name}")
+                        unchanged_ids.add(order.id)
+                        order_ids_by_key[key] = order.id
+                        continue
+                    if order:
+                        _logger.info(f"[KITCHEN] 📋 Updating existing order: {order.name}")
+                        try:
+                            with self.env.cr.savepoint():
+                                if not self._update_kitchen_order(order, order_data, product_cache):
+                                    raise UserError(f"Kitchen update failed for {order.name}")
+                            order_ids_by_key[key] = order.id
+                        except Exception as update_error:
+                            _logger.error(f"[KITCHEN] ❌ Update rolled back for {order.name}: {update_error}")
+                        continue
+
+                    if key[1] not in valid_config_ids or order_data.get('session_id') not in valid_session_ids:
                         _logger.error(
-                            f"[KITCHEN] ❌ Error processing order: {order_error}", 
-                            exc_info=True
+                            f"[KITCHEN] ❌ Invalid config/session for {key[0]}: "
+                            f"config_id={key[1]}, session_id={order_data.get('session_id')}"
                         )
-                        self.env.cr.rollback()
                         continue
-                
-                _logger.info(
-                    f"[KITCHEN] ✅ Processing completed: {len(results)} orders"
+                    order_vals = self._prepare_kitchen_order_vals(order_data, product_cache)
+                    if order_vals:
+                        create_keys.append(key)
+                        create_vals_list.append(order_vals)
+
+                # ✅ ÉTAPE 4 : Création de toutes les nouvelles commandes en un appel
+                if create_vals_list:
+                    order_ids_by_key.update(self._create_kitchen_orders_isolated(create_keys, create_vals_list))
+
+                # ✅ ÉTAPE 5 : Assignation groupée des écrans (remplacement atomique (6, 0, ids))
+                assignments = self._assign_screens_bulk({
+                    order_id: payloads[key].get('target_screen_ids', [])
+                    for key, order_id in order_ids_by_key.items()
+                    if order_id not in unchanged_ids
+                })
+
+            # ✅ ÉTAPE 6 : Pas de commit explicite : le lot est commité une seule
+            # fois avec la transaction de la requête
+
+            # ✅ ÉTAPE 7 : Notifications en une passe
+            self._send_new_order_notifications(assignments, product_cache)
+
+            results = [
+                order_ids_by_key[key] for key in payloads
+                if order_ids_by_key.get(key) in assignments
+                or order_ids_by_key.get(key) in unchanged_ids
+            ]
+            _logger.info(
+                f"[KITCHEN] ✅ Processing completed: {len(results)} orders"
+            )
+            return results
+
+        except Exception as e:
+            _logger.error(
+                f"[KITCHEN] ❌ CRITICAL ERROR: {str(e)}", 
+                exc_info=True
+            )
+            return False
+
+
+    def _kitchen_active_order_clause(self):
+        """Fragment SQL : la commande `o` est une commande cuisine en cours du POS %(shop_id)s"""
+        return """
+            o.config_id = %(shop_id)s
+            AND o.is_cooking
+            AND o.state NOT IN ('cancel', 'paid')
+            AND o.order_status IS DISTINCT FROM 'cancel'
+        """
+
+    def _kitchen_visible_line_clause(self):
+        """
+        Fragment SQL : la ligne `line` est une ligne cuisine assignée
+        (kitchen_screen_ids, table de relation indexée) à l'écran %(screen_id)s
+        """
+        line_screens = self.env['pos.order.line']._fields['kitchen_screen_ids']
+        return f"""
+            line.is_cooking
+            AND EXISTS (
+                SELECT 1
+                  FROM "{line_screens.relation}" lrel
+                 WHERE lrel."{line_screens.column1}" = line.id
+                   AND lrel."{line_screens.column2}" = %(screen_id)s
+            )
+        """
+
+    def _query_screen_lines(self, screen_id, shop_id):
+        """
+        ✅ Requête SQL unique : lignes visibles des commandes ASSIGNÉES à l'écran.
+        Le coût dépend uniquement des commandes de cet écran.
+        Retourne une liste de tuples (order_id, line_id), triée comme l'affichage.
+        """
+        rel_table = self._fields['screen_ids'].relation
+        self.env.flush_all()
+        self.env.cr.execute(f"""
+            SELECT o.id, line.id
+              FROM "{rel_table}" rel
+              JOIN pos_order o ON o.id = rel.order_id
+              JOIN pos_order_line line ON line.order_id = o.id
+             WHERE rel.screen_id = %(screen_id)s
+               AND {self._kitchen_active_order_clause()}
+               AND {self._kitchen_visible_line_clause()}
+          ORDER BY o.date_order DESC, o.id DESC, line.id
+        """, {'screen_id': screen_id, 'shop_id': shop_id})
+        return self.env.cr.fetchall()
+
+    def _find_screen_assignment_drift(self, screen_id, shop_id):
+        """
+        Détecte en SQL les écarts d'assignation pour un écran :
+        - commandes avec des lignes visibles mais SANS l'écran assigné
+        - commandes avec l'écran assigné mais SANS ligne visible
+        Retourne (missing_order_ids, stale_order_ids).
+        """
+        rel_table = self._fields['screen_ids'].relation
+        params = {'screen_id': screen_id, 'shop_id': shop_id}
+        self.env.flush_all()
+
+        self.env.cr.execute(f"""
+            SELECT DISTINCT o.id
+              FROM pos_order o
+              JOIN pos_order_line line ON line.order_id = o.id
+             WHERE {self._kitchen_active_order_clause()}
+               AND {self._kitchen_visible_line_clause()}
+               AND NOT EXISTS (
+                    SELECT 1 FROM "{rel_table}" rel
+                     WHERE rel.order_id = o.id AND rel.screen_id = %(screen_id)s
+               )
+        """, params)
+        missing_order_ids = [row[0] for row in self.env.cr.fetchall()]
+
+        self.env.cr.execute(f"""
+            SELECT o.id
+              FROM "{rel_table}" rel
+              JOIN pos_order o ON o.id = rel.order_id
+             WHERE rel.screen_id = %(screen_id)s
+               AND {self._kitchen_active_order_clause()}
+               AND NOT EXISTS (
+                    SELECT 1 FROM pos_order_line line
+                     WHERE line.order_id = o.id
+                       AND {self._kitchen_visible_line_clause()}
+               )
+        """, params)
+        stale_order_ids = [row[0] for row in self.env.cr.fetchall()]
+
+        return missing_order_ids, stale_order_ids
+
+    @api.model
+    def _cron_reconcile_kitchen_screens(self, batch_size=500):
+        """
+        ✅ TÂCHE PLANIFIÉE : corrige par lots les écarts d'assignation
+        commande/écran (écran manquant ou écran sans ligne visible).
+        get_details reste ainsi strictement en lecture seule.
+        """
+        screens = self.env['kitchen.screen'].sudo().search([('active', '=', True)])
+        orders = self.sudo().with_context(skip_status_notification=True)
+        linked_count = unlinked_count = 0
+
+        # ✅ Lignes jamais routées (les lignes routées vers aucun écran sont exclues :
+        # elles ne bloquent plus le lot)
+        unassigned_lines = self.env['pos.order.line'].sudo().search(
+            self.env['pos.order.line']._get_open_kitchen_lines_domain(screens.pos_config_id.ids)
+            + [('kitchen_screen_ids', '=', False), ('kitchen_routed', '=', False)],
+            limit=batch_size
+        )
+        if unassigned_lines:
+            unassigned_lines._assign_kitchen_screens()
+
+        for screen in screens:
+            try:
+                missing_order_ids, stale_order_ids = self._find_screen_assignment_drift(
+                    screen.id, screen.pos_config_id.id
                 )
-                
-                return results
-                
+
+                if stale_order_ids:
+                    orders.browse(stale_order_ids[:batch_size]).write({
+                        'screen_ids': [(3, screen.id)]  # Unlink
+                    })
+                    unlinked_count += len(stale_order_ids[:batch_size])
+
+                if missing_order_ids:
+                    orders.browse(missing_order_ids[:batch_size]).write({
+                        'screen_ids': [(4, screen.id)]  # Link
+                    })
+                    linked_count += len(missing_order_ids[:batch_size])
+
             except Exception as e:
                 _logger.error(
-                    f"[KITCHEN] ❌ CRITICAL ERROR: {str(e)}", 
+                    f"[KITCHEN] ❌ Reconciliation failed for screen '{screen.name}': {e}",
                     exc_info=True
                 )
-                self.env.cr.rollback()
-                return False
-    
 
+        if linked_count or unlinked_count:
+            _logger.info(
+                f"[KITCHEN] 🔧 Screen reconciliation: {linked_count} orders linked, "
+                f"{unlinked_count} orders unlinked across {len(screens)} screens"
+            )
+        return True
+
+    def _get_screen_orders_and_lines(self, kitchen_screen, shop_id):
+        """
+        Détermine les commandes et lignes visibles pour un écran.
+        Retourne un tuple (commandes, lignes) de recordsets.
+        """
+        # ✅ LECTURE SEULE : les écarts d'assignation sont corrigés par
+        # _cron_reconcile_kitchen_screens, jamais pendant une lecture
+        rows = self._query_screen_lines(kitchen_screen.id, shop_id)
+        order_ids = list(dict.fromkeys(order_id for order_id, _line_id in rows))
+        line_ids = [line_id for _order_id, line_id in rows]
+
+        _logger.info(
+            f"[KITCHEN] 📦 SQL membership: {len(order_ids)} orders, {len(line_ids)} lines"
+        )
+
+        return (
+            self.env["pos.order"].sudo().browse(order_ids),
+            self.env["pos.order.line"].sudo().browse(line_ids),
+        )
+
+    @api.model
+    def _get_kitchen_order_fields(self):
+        """
+        ✅ Schéma du payload cuisine : champs de pos.order envoyés aux écrans.
+        Les modules tiers peuvent étendre la liste via super().
+        """
+        return [
+            'name',
+            'pos_reference',
+            'order_ref',
+            'tracking_number',
+            'order_status',
+            'state',
+            'date_order',
+            'write_date',
+            'table_id',
+            'config_id',
+            'session_id',
+            'lines',
+            'screen_ids',
+            'is_cooking',
+            'avg_prepare_time',
+        ]
+
+    def _read_kitchen_fields(self, field_names):
+        """Lecture groupée limitée aux champs existants du schéma cuisine"""
+        return self.read([name for name in field_names if name in self._fields])
+
+    def _prepare_kitchen_orders_data(self, orders):
+        """
+        Sérialise les commandes pour le frontend (heure locale, étage).
+        L'heure est convertie dans un fuseau propre à la commande (société, puis
+        vendeur, puis utilisateur de la session) et non celui de l'utilisateur
+        courant : le payload est mis en cache et envoyé sur le bus depuis la
+        transaction d'un caissier, d'un cuisinier ou du cron.
+        """
+        orders_data = []
+        utc = pytz.utc
+        tz_by_order = {
+            order.id: pytz.timezone(
+                order.company_id.partner_id.tz
+                or order.user_id.tz
+                or order.session_id.user_id.tz
+                or 'UTC'
+            )
+            for order in orders
+        }
+
+        # ✅ Une seule lecture pour toutes les commandes, champs projetés
+        for order_dict in orders._read_kitchen_fields(self._get_kitchen_order_fields()):
+            
+            # Conversion de l'heure
+            date_str = order_dict.get('date_order')
+            try:
+                if isinstance(date_str, str):
+                    utc_dt = datetime.strptime(date_str, "%Y-%m-%d %H:%M:%S")
+                    utc_dt = utc.localize(utc_dt)
+                else:
+                    utc_dt = utc.localize(order_dict['date_order'])
+
+                local_dt = utc_dt.astimezone(tz_by_order.get(order_dict['id'], utc))
+                order_dict['hour'] = local_dt.hour
+                order_dict['formatted_minutes'] = f"{local_dt.minute:02d}"
+                order_dict['minutes'] = local_dt.minute
+            except Exception as time_error:
+                _logger.warning(f"[KITCHEN] Time conversion error: {time_error}")
+                order_dict['hour'] = 0
+                order_dict['minutes'] = 0
+                order_dict['formatted_minutes'] = "00"
+            
+            # Ajouter le nom du floor si table
+            if order_dict.get('table_id'):
+                order_dict['floor'] = order_dict['table_id'][1].split(',')[0].strip()
+            
+            orders_data.append(order_dict)
+
+        return orders_data
 
+    def _build_kitchen_snapshot(self, kitchen_screen, shop_id, version):
+        """
+        Construit le payload complet d'un écran (commandes + lignes projetées).
+        Retourne None si l'écran n'a aucune catégorie configurée.
+        """
+        # ✅ Horodatage de la lecture : servira de curseur pour l'appel suivant
+        read_started_at = fields.Datetime.now()
+
+        screen_categ_ids = kitchen_screen.pos_categ_ids.ids
+        screen_name = kitchen_screen.display_name_custom or kitchen_screen.name
+        
+        _logger.info(
+            f"[KITCHEN] 📺 Screen: '{screen_name}' (ID: {kitchen_screen.id}), "
+            f"Categories: {screen_categ_ids}"
+        )
+
+        if not screen_categ_ids:
+            _logger.warning(f"[KITCHEN] ⚠ Screen has NO categories configured")
+            return None
+
+        orders, lines = self._get_screen_orders_and_lines(kitchen_screen, shop_id)
+
+        _logger.info(
+            f"[KITCHEN] ✅ FINAL RESULT: {len(orders)} orders, "
+            f"{len(lines)} lines for screen '{screen_name}'"
+        )
+
+        return {
+            "orders": self._prepare_kitchen_orders_data(orders),
+            "order_lines": lines._read_kitchen_fields(lines._get_kitchen_line_fields()),
+            "order_ids": orders.ids,
+            "line_ids": lines.ids,
+            "is_delta": False,
+            "cursor": fields.Datetime.to_string(read_started_at),
+            "version": version,
+            "screen_id": kitchen_screen.id,
+            "screen_name": screen_name,
+            "screen_categories": screen_categ_ids
+        }
+
+    def _get_kitchen_snapshot(self, kitchen_screen, shop_id, version):
+        """
+        ✅ Snapshot d'un écran servi depuis le cache mémoire du worker.
+        La clé contient la version stockée en base : une entrée n'est jamais
+        servie après une modification, quel que soit le worker qui l'a faite.
+        """
+        key = (
+            self.env.cr.dbname,
+            kitchen_screen.id,
+            shop_id,
+            version,
+            self.env.lang,
+        )
+
+        with _kitchen_snapshot_lock:
+            snapshot = _kitchen_snapshot_cache.get(key)
+            if snapshot is not None:
+                _kitchen_snapshot_cache.move_to_end(key)
+        if snapshot is not None:
+            _logger.info(f"[KITCHEN] ⚡ Snapshot cache hit for screen {kitchen_screen.id} (version {version})")
+            return snapshot
+
+        snapshot = self._build_kitchen_snapshot(kitchen_screen, shop_id, version)
+        if snapshot is None:
+            return None
+
+        with _kitchen_snapshot_lock:
+            _kitchen_snapshot_cache[key] = snapshot
+            while len(_kitchen_snapshot_cache) > KITCHEN_SNAPSHOT_CACHE_SIZE:
+                _kitchen_snapshot_cache.popitem(last=False)
+        return snapshot
+
+    @api.model
+    def _evict_kitchen_snapshots(self, screen_ids):
+        """Retire du cache local les snapshots des écrans modifiés"""
+        dbname = self.env.cr.dbname
+        screen_ids = set(screen_ids)
+        with _kitchen_snapshot_lock:
+            for key in [k for k in _kitchen_snapshot_cache if k[0] == dbname and k[1] in screen_ids]:
+                del _kitchen_snapshot_cache[key]
+
+    def _parse_kitchen_cursor(self, cursor):
+        """
+        Convertit le curseur reçu du frontend en datetime UTC.
+        Retourne None si le curseur est absent ou invalide (=> chargement complet).
+        """
+        if not cursor:
+            return None
+        try:
+            return fields.Datetime.to_datetime(cursor)
+        except (TypeError, ValueError):
+            _logger.warning(f"[KITCHEN] ⚠ Invalid cursor received: {cursor!r}")
+            return None
 
     @api.model
     def get_details(self, shop_id, screen_id=None, *args, **kwargs):
@@ -654,11 +956,36 @@ class PosOrder(models.Model):
         ✅ REFONTE COMPLÈTE : Logique claire et robuste
         Retourne TOUTES les commandes où cet écran est assigné,
         avec UNIQUEMENT les lignes visibles pour cet écran
+
+        ✅ MODE DELTA : si ``cursor`` (renvoyé par l'appel précédent) est fourni,
+        seules les commandes/lignes modifiées depuis ce curseur sont sérialisées.
+        ``order_ids`` / ``line_ids`` contiennent toujours la liste complète des
+        ids visibles, ce qui permet au frontend de retirer les éléments disparus.
+
+        ✅ MODE CONDITIONNEL : si ``version`` (renvoyée par l'appel précédent)
+        est toujours la version courante de l'écran, seule une réponse
+        ``{"unchanged": True}`` est renvoyée, sans aucune sérialisation.
         """
+        cursor = kwargs.get('cursor')
+        version = kwargs.get('version')
+        empty_result = {
+            "orders": [],
+            "order_lines": [],
+            "order_ids": [],
+            "line_ids": [],
+            "prepare_times": [],
+            "is_delta": False,
+            "cursor": None,
+            "version": None,
+            "screen_id": screen_id if screen_id else None,
+            "screen_name": None,
+            "screen_categories": []
+        }
+
         try:
             _logger.info(f"[KITCHEN] 🔍 ==========================================")
             _logger.info(f"[KITCHEN] 🔍 GET_DETAILS called")
-            _logger.info(f"[KITCHEN] 🔍 shop_id={shop_id}, screen_id={screen_id}")
+            _logger.info(f"[KITCHEN] 🔍 shop_id={shop_id}, screen_id={screen_id}, cursor={cursor}")
             
             # ✅ Forcer le refresh du cache
             self.env.invalidate_all()
@@ -666,216 +993,90 @@ class PosOrder(models.Model):
             # ✅ ÉTAPE 1 : Récupérer l'écran
             if not screen_id:
                 _logger.warning(f"[KITCHEN] ⚠ No screen_id provided")
-                return {
-                    "orders": [],
-                    "order_lines": [],
-                    "screen_id": None,
-                    "screen_name": None,
-                    "screen_categories": []
-                }
+                return empty_result
             
             kitchen_screen = self.env["kitchen.screen"].sudo().browse(screen_id)
             if not kitchen_screen.exists():
                 _logger.error(f"[KITCHEN] ❌ Screen {screen_id} not found")
-                return {
-                    "orders": [],
-                    "order_lines": [],
-                    "screen_id": screen_id,
-                    "screen_name": "Not Found",
-                    "screen_categories": []
-                }
+                return dict(empty_result, screen_name="Not Found")
 
-            screen_categ_ids = kitchen_screen.pos_categ_ids.ids
-            screen_name = kitchen_screen.display_name_custom or kitchen_screen.name
-            
-            _logger.info(
-                f"[KITCHEN] 📺 Screen: '{screen_name}' (ID: {screen_id}), "
-                f"Categories: {screen_categ_ids}"
-            )
-
-            if not screen_categ_ids:
-                _logger.warning(f"[KITCHEN] ⚠ Screen has NO categories configured")
+            # ✅ Contenu inchangé depuis la version connue du client
+            current_version = kitchen_screen.kitchen_version
+            if version is not None and version == current_version:
+                _logger.info(f"[KITCHEN] 💤 Screen {screen_id} unchanged (version {current_version})")
                 return {
-                    "orders": [],
-                    "order_lines": [],
+                    "unchanged": True,
+                    "version": current_version,
+                    "seq": kitchen_screen.kitchen_event_seq,
                     "screen_id": screen_id,
-                    "screen_name": screen_name,
-                    "screen_categories": []
                 }
 
-            # ✅ ÉTAPE 2 : Rechercher TOUTES les commandes cuisine actives
-            all_cooking_orders = self.env["pos.order"].sudo().search([
-                ("is_cooking", "=", True),
-                ("config_id", "=", shop_id),
-                ("state", "not in", ["cancel", "paid"]),
-                ("order_status", "!=", "cancel"),
-            ])
-
-            _logger.info(f"[KITCHEN] 📦 Found {len(all_cooking_orders)} total cooking orders")
-
-            # ✅ ÉTAPE 3 : Filtrer les commandes pour CET écran
-            orders_for_this_screen = []
-            all_visible_lines = self.env['pos.order.line']
-            
-            for order in all_cooking_orders:
-                try:
-                    # Vérifier si cet écran est assigné à la commande
-                    current_screen_ids = order.screen_ids.ids
-                    is_screen_assigned = screen_id in current_screen_ids
-                    
-                    _logger.info(
-                        f"[KITCHEN] 🔍 Order {order.name}: "
-                        f"screen_ids={current_screen_ids}, "
-                        f"is_assigned={is_screen_assigned}"
-                    )
-                    
-                    if is_screen_assigned:
-                        # ✅ Récupérer les lignes visibles pour cet écran
-                        visible_lines = self._get_visible_lines_for_screen(order, kitchen_screen)
-                        
-                        if visible_lines:
-                            # ✅ CAS NORMAL : Écran assigné ET lignes visibles
-                            orders_for_this_screen.append(order)
-                            all_visible_lines |= visible_lines
-                            _logger.info(
-                                f"[KITCHEN] ✅ Order {order.name} INCLUDED: "
-                                f"{len(visible_lines)} visible lines"
-                            )
-                        else:
-                            # ⚠️ CAS ANORMAL : Écran assigné MAIS aucune ligne visible
-                            _logger.warning(
-                                f"[KITCHEN] ⚠️ Order {order.name} assigned to screen BUT "
-                                f"has NO visible lines! This should not happen."
-                            )
-                            # ✅ CORRECTION AUTO : Retirer cet écran de la commande
-                            _logger.info(f"[KITCHEN] 🔧 Auto-removing screen from order {order.name}")
-                            try:
-                                order.sudo().with_context(skip_status_notification=True).write({
-                                    'screen_ids': [(3, screen_id)]  # Unlink
-                                })
-                                self.env.cr.commit()
-                                _logger.info(f"[KITCHEN] ✅ Screen removed from order {order.name}")
-                            except Exception as unlink_error:
-                                _logger.error(f"[KITCHEN] ❌ Failed to unlink screen: {unlink_error}")
-                    else:
-                        # Écran NON assigné : vérifier s'il devrait l'être
-                        should_be_assigned = self._should_order_be_on_screen(order, kitchen_screen)
-                        
-                        if should_be_assigned:
-                            _logger.info(
-                                f"[KITCHEN] 🔧 Order {order.name} SHOULD be assigned - "
-                                f"auto-assigning..."
-                            )
-                            try:
-                                # Assigner l'écran
-                                order.sudo().with_context(skip_status_notification=True).write({
-                                    'screen_ids': [(4, screen_id)]  # Link
-                                })
-                                self.env.cr.commit()
-                                
-                                # Récupérer les lignes visibles
-                                visible_lines = self._get_visible_lines_for_screen(order, kitchen_screen)
-                                
-                                if visible_lines:
-                                    orders_for_this_screen.append(order)
-                                    all_visible_lines |= visible_lines
-                                    _logger.info(
-                                        f"[KITCHEN] ✅ Order {order.name} auto-assigned and INCLUDED: "
-                                        f"{len(visible_lines)} visible lines"
-                                    )
-                                else:
-                                    _logger.warning(
-                                        f"[KITCHEN] ⚠️ Order {order.name} auto-assigned but "
-                                        f"NO visible lines found!"
-                                    )
-                            except Exception as assign_error:
-                                _logger.error(
-                                    f"[KITCHEN] ❌ Auto-assignment failed for {order.name}: "
-                                    f"{assign_error}"
-                                )
-                        else:
-                            _logger.debug(
-                                f"[KITCHEN] ⏭️ Order {order.name} NOT for this screen - skipped"
-                            )
-                
-                except Exception as order_error:
-                    _logger.error(
-                        f"[KITCHEN] ❌ Error processing order {order.id}: {order_error}",
-                        exc_info=True
-                    )
-                    continue
-
-            _logger.info(
-                f"[KITCHEN] ✅ FINAL RESULT: {len(orders_for_this_screen)} orders, "
-                f"{len(all_visible_lines)} lines for screen '{screen_name}'"
-            )
+            # ✅ ÉTAPE 2 : Snapshot complet de l'écran (cache mémoire LRU par version)
+            snapshot = self._get_kitchen_snapshot(kitchen_screen, shop_id, current_version)
+            if snapshot is None:
+                return dict(empty_result, screen_name=kitchen_screen.display_name_custom or kitchen_screen.name)
+
+            # ✅ ÉTAPE 3 : Delta depuis le curseur (sauf si l'écran a été reconfiguré)
+            since = self._parse_kitchen_cursor(cursor)
+            if since:
+                since -= KITCHEN_CURSOR_OVERLAP
+                if kitchen_screen.write_date and kitchen_screen.write_date >= since:
+                    _logger.info(f"[KITCHEN] 🔄 Screen configuration changed - full reload")
+                    since = None
+
+            if since:
+                changed_orders = [
+                    order for order in snapshot['orders']
+                    if order.get('write_date') and order['write_date'] >= since
+                ]
+                changed_lines = [
+                    line for line in snapshot['order_lines']
+                    if line.get('write_date') and line['write_date'] >= since
+                ]
+                _logger.info(
+                    f"[KITCHEN] 🔄 DELTA: {len(changed_orders)} orders, "
+                    f"{len(changed_lines)} lines changed since {cursor}"
+                )
+            else:
+                changed_orders = snapshot['orders']
+                changed_lines = snapshot['order_lines']
             _logger.info(f"[KITCHEN] ==========================================")
 
-            # ✅ ÉTAPE 4 : Préparer les données pour le frontend
-            orders_data = []
-            for order in orders_for_this_screen:
-                order_dict = order.read([])[0]
-                
-                # Conversion de l'heure
-                user_tz_str = self.env.user.tz or 'UTC'
-                user_tz = pytz.timezone(user_tz_str)
-                utc = pytz.utc
-                
-                date_str = order_dict.get('date_order')
-                try:
-                    if isinstance(date_str, str):
-                        utc_dt = datetime.strptime(date_str, "%Y-%m-%d %H:%M:%S")
-                        utc_dt = utc.localize(utc_dt)
-                    else:
-                        utc_dt = utc.localize(order_dict['date_order'])
-
-                    local_dt = utc_dt.astimezone(user_tz)
-                    order_dict['hour'] = local_dt.hour
-                    order_dict['formatted_minutes'] = f"{local_dt.minute:02d}"
-                    order_dict['minutes'] = local_dt.minute
-                except Exception as time_error:
-                    _logger.warning(f"[KITCHEN] Time conversion error: {time_error}")
-                    order_dict['hour'] = 0
-                    order_dict['minutes'] = 0
-                    order_dict['formatted_minutes'] = "00"
-                
-                # Ajouter le nom du floor si table
-                if order_dict.get('table_id'):
-                    order_dict['floor'] = order_dict['table_id'][1].split(',')[0].strip()
-                
-                orders_data.append(order_dict)
-
-            lines_data = all_visible_lines.read([])
-
-            return {
-                "orders": orders_data,
-                "order_lines": lines_data,
-                "screen_id": screen_id,
-                "screen_name": screen_name,
-                "screen_categories": screen_categ_ids
-            }
+            # ✅ ÉTAPE 4 : Temps de préparation (index en cache, pas de RPC supplémentaire)
+            product_ids = sorted({
+                line['product_id'][0] for line in snapshot['order_lines'] if line.get('product_id')
+            })
+            prepare_times = self.env['product.product']._get_kitchen_prepare_times(product_ids)
+
+            # ✅ ÉTAPE 5 : Réponse pour le frontend
+            return dict(
+                snapshot,
+                orders=changed_orders,
+                order_lines=changed_lines,
+                prepare_times=prepare_times,
+                seq=kitchen_screen.kitchen_event_seq,
+                is_delta=bool(since),
+            )
 
         except Exception as e:
             _logger.error(
                 f"[KITCHEN] ❌ CRITICAL ERROR in get_details: {str(e)}", 
                 exc_info=True
             )
-            return {
-                "orders": [],
-                "order_lines": [],
-                "screen_id": screen_id if screen_id else None,
-                "screen_name": "Error",
-                "screen_categories": []
-            }
+            return dict(empty_result, screen_name="Error")
 
     
     @api.model
     def trigger_kitchen_notifications(self, pos_reference, screen_ids):
         """
         ✅ NOUVELLE MÉTHODE: Déclenche les notifications backend pour les écrans
-        Appelée depuis le POS après soumission d'une commande
+        Appelée depuis le POS après soumission d'une commande, avec tous les
+        écrans en un appel. Les alertes déjà envoyées pour la même version de
+        la commande (par create_or_update_kitchen_order) ne sont pas renvoyées.
         """
         try:
+            if isinstance(screen_ids, int):
+                screen_ids = [screen_ids]
             _logger.info(f"[KITCHEN] 🔔 Triggering notifications for order {pos_reference} to screens: {screen_ids}")
             
             # Récupérer la commande
@@ -894,9 +1095,8 @@ class PosOrder(models.Model):
             
             _logger.info(f"[KITCHEN] 📡 Sending notifications to {len(screens)} screens")
             
-            # Envoyer une notification à CHAQUE écran
-            for screen in screens:
-                self._send_new_order_notification(screen, order)
+            # Une passe pour tous les écrans (dédoublonnée au commit)
+            self._send_new_order_notifications({order.id: screens.ids})
             
             _logger.info(f"[KITCHEN] ✅ Notifications sent successfully")
             return True
@@ -907,69 +1107,292 @@ class PosOrder(models.Model):
         
 
 
-    def _send_new_order_notification(self, screen, order):
+    @api.model
+    def _queue_kitchen_notification(self, channel, notification_type, message):
         """
-        ✅ CORRIGÉE : Envoyer TOUJOURS, même sans lignes visibles
-        Le frontend filtrera lors du loadOrders
+        ✅ Met une notification bus en attente jusqu'au commit de la transaction.
+        Dédoublonnage par (canal, type, commande) : seul le dernier message est envoyé,
+        sauf 'order_lines_updated' dont les lignes sont fusionnées par id (la
+        plus récente l'emporte) pour un seul message portant toutes les lignes.
         """
-        try:
-            if not screen.exists() or not order.exists():
-                _logger.warning("[KITCHEN] Invalid screen or order for new order notification")
-                return
+        precommit = self.env.cr.precommit
+        pending = precommit.data.get('kitchen.bus.notifications')
+        if pending is None:
+            pending = precommit.data['kitchen.bus.notifications'] = {}
+            precommit.add(self._flush_kitchen_notifications)
+
+        key = (channel, notification_type, message.get('order_id'))
+        previous = pending.pop(key, None)  # conserve l'ordre du dernier événement
+        if previous and notification_type == 'order_lines_updated':
+            lines_by_id = {line['id']: line for line in previous.get('lines', [])}
+            lines_by_id.update((line['id'], line) for line in message.get('lines', []))
+            message = dict(
+                message,
+                lines=list(lines_by_id.values()),
+                line_ids=list(dict.fromkeys(previous.get('line_ids', []) + message.get('line_ids', []))),
+            )
+        pending[key] = message
 
-            channel = f"kitchen.screen.{screen.id}"
-            screen_categ_ids = screen.pos_categ_ids.ids
-            screen_name = screen.display_name_custom or screen.name or f"Screen {screen.id}"
+    def _flush_kitchen_notifications(self):
+        """
+        Envoie en un seul _sendmany les notifications en attente.
+        Exécuté en precommit : les lignes bus.bus sont écrites dans la même
+        transaction que les données (le réveil websocket est différé au
+        postcommit par bus.bus). Une transaction annulée n'envoie donc rien.
+        """
+        pending = self.env.cr.precommit.data.pop('kitchen.bus.notifications', {})
+        if not pending:
+            return
+
+        # Commandes supprimées entre-temps (savepoint annulé) : rien à notifier
+        order_ids = {order_id for _channel, _type, order_id in pending if order_id}
+        existing_ids = set(self.env['pos.order'].sudo().browse(order_ids).exists().ids)
+
+        orders_by_id = {order.id: order for order in self.sudo().browse(existing_ids)}
+        entries = []
+        for (channel, notification_type, order_id), message in pending.items():
+            if order_id and order_id not in existing_ids:
+                continue
+            dedup_key = self._kitchen_dedup_key(message, orders_by_id.get(order_id))
+            entries.append((channel, notification_type, self._encode_kitchen_message(message), dedup_key))
+
+        # ✅ Un seul message par événement logique
+        KitchenEvent = self.env['kitchen.screen.event']
+        entries = KitchenEvent._filter_duplicate_events(entries)
+
+        # ✅ Versions et séquences des écrans : un seul UPDATE pour la transaction
+        KitchenScreen = self.env['kitchen.screen'].sudo()
+        event_counts = Counter(message['s'] for _channel, _type, message, _key in entries if message.get('s'))
+        counters = KitchenScreen._flush_kitchen_versions(event_counts)
+        bumped_versions = self.env.cr.precommit.data.get('kitchen.screen.bumped', {})
+
+        # ✅ Delta prêt à afficher par (écran, commande), encodé en compact, puis journal numéroté
+        deltas = {}
+        schema = self._get_kitchen_delta_schema() if entries else None
+        for _channel, _type, message, _key in entries:
+            screen_id, order_id = message.get('s'), message.get('o')
+            if screen_id and order_id:
+                if (screen_id, order_id) not in deltas:
+                    deltas[(screen_id, order_id)] = self._encode_kitchen_delta(self._prepare_kitchen_delta(
+                        KitchenScreen.browse(screen_id), orders_by_id[order_id], bumped_versions
+                    ), schema)
+                message['d'] = deltas[(screen_id, order_id)]
+                if message['d']['od'] is not None:
+                    # Nom et référence sont dans la commande du delta
+                    message.pop('n', None)
+                    message.pop('r', None)
+        KitchenEvent._record_kitchen_events(
+            entries, {screen_id: seq for screen_id, (_version, seq) in counters.items()}
+        )
+        notifications = [(channel, notification_type, message) for channel, notification_type, message, _key in entries]
+        if notifications:
+            self.env['bus.bus'].sudo()._sendmany(notifications)
+        _logger.info(f"[KITCHEN] 📡 Flushed {len(notifications)} bus notifications")
 
-            # ✅ Récupérer les lignes visibles (pour info seulement)
-            visible_lines = order.lines.filtered(
-                lambda line: (
-                    line.is_cooking and 
-                    line.product_id and 
-                    (set(line.product_id.pos_categ_ids.ids) & set(screen_categ_ids))
-                )
-            )
+    @api.model
+    def _kitchen_dedup_key(self, message, order=None):
+        """
+        Clé (type, commande, version de contenu) d'une alerte 'new_order'.
+        Version de contenu : empreinte du payload POS accepté (identique quelle
+        que soit la source de l'alerte), plus les lignes annoncées.
+        Les changements de statut ne sont pas dédoublonnés entre transactions :
+        un aller-retour ready → waiting → ready doit toujours être envoyé
+        (l'écriture d'une ligne ne change pas write_date de la commande).
+        """
+        if not message.get('order_id') or message.get('type') != 'new_order':
+            return False
+        version = order.kitchen_payload_hash if order and order.kitchen_payload_hash else None
+        content = [
+            version,
+            sorted(
+                (line.get('id'), line.get('qty'), line.get('order_status'), line.get('note') or '')
+                for line in message.get('lines', [])
+            ),
+        ]
+        digest = hashlib.sha1(json.dumps(content, default=str).encode('utf-8')).hexdigest()
+        return f"{message.get('type')}:{message['order_id']}:{digest}"
 
-            # ✅ CHANGEMENT CRITIQUE: Envoyer MÊME si visible_lines est vide
-            # Le frontend fera le filtrage lors du loadOrders()
-            _logger.info(
-                f"[KITCHEN] 🔔 Sending notification to '{screen_name}' "
-                f"({len(visible_lines)} visible lines)"
-            )
+    @api.model
+    def _encode_kitchen_message(self, message):
+        """
+        ✅ Format bus compact (v2+) : clés courtes, ids au lieu des noms répétés
+        (résolus côté écran via kitchen.screen.get_kitchen_bus_dictionary),
+        horodatage epoch en secondes. Lignes : [id, product_id, qty, statut, note].
+        """
+        compact = {
+            "_v": KITCHEN_BUS_SCHEMA_VERSION,
+            "t": message.get("type"),
+            "s": message.get("screen_id"),
+            "c": message.get("config_id"),
+            "o": message.get("order_id"),
+            "n": message.get("order_name"),
+            "r": message.get("order_reference"),
+            "st": message.get("order_status"),
+            "tb": message.get("table_id") or None,
+            "ts": int(time.time()),
+        }
+        if "lines" in message:
+            compact["l"] = [[
+                line.get("id"),
+                line.get("product_id"),
+                line.get("qty"),
+                line.get("order_status"),
+                line.get("note") or "",
+            ] for line in message["lines"]]
+        # Le delta ("d") est ajouté au flush, une fois la version de l'écran attribuée
+        # Les clés vides ne sont pas transmises
+        return {key: value for key, value in compact.items() if value is not None}
 
-            # ✅ Message de notification
-            message = {
-                "type": "new_order",
-                "screen_id": screen.id,
-                "screen_name": screen_name,
-                "order_id": order.id,
-                "order_name": order.name,
-                "order_reference": order.pos_reference,
-                "order_ref": order.order_ref or order.name,
-                "order_status": order.order_status,
-                "table_name": order.table_id.display_name if order.table_id else None,
-                "config_id": order.config_id.id,
-                "config_name": order.config_id.name,
-                "timestamp": fields.Datetime.now().isoformat(),
-                "lines_count": len(visible_lines),
-                "lines": [{
-                    'id': line.id,
-                    'product_name': line.product_id.display_name,
-                    'qty': line.qty,
-                    'note': line.note or '',
-                } for line in visible_lines if line.product_id]
+    @api.model
+    def _get_kitchen_delta_schema(self):
+        """
+        ✅ Schéma des deltas compacts (v3), envoyé à l'écran avec le dictionnaire
+        bus : ordre des champs, relations résolues par id, champs datetime.
+        """
+        def describe(model, field_names):
+            names = ['id'] + [name for name in field_names if name in model._fields]
+            fields_by_name = {name: model._fields[name] for name in names[1:]}
+            return {
+                'fields': names,
+                'refs': {
+                    name: KITCHEN_DELTA_REFS[field.comodel_name]
+                    for name, field in fields_by_name.items()
+                    if field.type == 'many2one' and field.comodel_name in KITCHEN_DELTA_REFS
+                },
+                'dates': [name for name, field in fields_by_name.items() if field.type == 'datetime'],
             }
 
-            # ✅ ENVOI sur le bus
-            self.env["bus.bus"]._sendone(channel, "new_order", message)
+        Line = self.env['pos.order.line']
+        order_schema = describe(self, self._get_kitchen_order_fields())
+        # Heure locale calculée côté serveur (fuseau de la commande)
+        order_schema['fields'] += ['hour', 'minutes']
+        return {'order': order_schema, 'line': describe(Line, Line._get_kitchen_line_fields())}
 
+    @api.model
+    def _encode_kitchen_record(self, record, schema):
+        """Enregistrement lu (read) → liste de valeurs dans l'ordre du schéma"""
+        refs, dates = schema['refs'], set(schema['dates'])
+        values = []
+        for name in schema['fields']:
+            value = record.get(name, False)
+            if name in refs and isinstance(value, (list, tuple)):
+                value = value[0]
+            elif name in dates and value:
+                value = int(pytz.utc.localize(fields.Datetime.to_datetime(value)).timestamp())
+            values.append(value)
+        return values
+
+    @api.model
+    def _encode_kitchen_delta(self, delta, schema):
+        """
+        ✅ Delta compact : valeurs positionnelles (voir _get_kitchen_delta_schema),
+        ids au lieu des paires [id, nom], dates en secondes epoch.
+        """
+        return {
+            'v': delta['version'],
+            'bv': delta['base_version'],
+            'od': self._encode_kitchen_record(delta['order'], schema['order']) if delta['order'] else None,
+            'l': [self._encode_kitchen_record(line, schema['line']) for line in delta['order_lines']],
+            'p': [[item['id'], item['prepair_time_minutes']] for item in delta['prepare_times']],
+        }
+
+    def _prepare_kitchen_delta(self, screen, order, bumped_versions):
+        """
+        ✅ Delta prêt à afficher pour un écran : la commande et ses lignes visibles
+        projetées exactement comme dans get_details, avec la version de l'écran.
+        ``base_version`` est la version que le client doit avoir pour appliquer
+        le delta ; sinon il détecte un trou et recharge via get_details.
+        """
+        if screen.id in bumped_versions:
+            version = bumped_versions[screen.id]
+            base_version = version - 1
+        else:
+            version = base_version = screen.kitchen_version
+
+        is_active = (
+            order.is_cooking
+            and order.state not in ('cancel', 'paid')
+            and order.order_status != 'cancel'
+            and (not screen.pos_config_id or order.config_id == screen.pos_config_id)
+        )
+        lines = self._get_visible_lines_for_screen(order, screen) if is_active else self.env['pos.order.line']
+        product_ids = sorted(set(lines.product_id.ids))
+
+        return {
+            "version": version,
+            "base_version": base_version,
+            "order_id": order.id,
+            "order": self._prepare_kitchen_orders_data(order)[0] if lines else None,
+            "order_lines": lines._read_kitchen_fields(lines._get_kitchen_line_fields()),
+            "prepare_times": self.env['product.product']._get_kitchen_prepare_times(product_ids),
+        }
+
+    def _prepare_new_order_message(self, screen, order, product_cache=None):
+        """✅ Message bus 'new_order' d'une commande pour un écran"""
+        screen_name = screen.display_name_custom or screen.name or f"Screen {screen.id}"
+
+        # ✅ Récupérer les lignes visibles (pour info seulement)
+        visible_lines = self._get_visible_lines_for_screen(order, screen)
+
+        return {
+            "type": "new_order",
+            "screen_id": screen.id,
+            "screen_name": screen_name,
+            "order_id": order.id,
+            "order_name": order.name,
+            "order_reference": order.pos_reference,
+            "order_ref": order.order_ref or order.name,
+            "order_status": order.order_status,
+            "table_id": order.table_id.id,
+            "table_name": order.table_id.display_name if order.table_id else None,
+            "config_id": order.config_id.id,
+            "config_name": order.config_id.name,
+            "timestamp": fields.Datetime.now().isoformat(),
+            "lines_count": len(visible_lines),
+            "lines": [{
+                'id': line.id,
+                'product_id': line.product_id.id,
+                'product_name': (
+                    product_cache[line.product_id.id]['display_name']
+                    if product_cache and line.product_id.id in product_cache
+                    else line.product_id.display_name
+                ),
+                'qty': line.qty,
+                'note': line.note or '',
+            } for line in visible_lines if line.product_id]
+        }
+
+    def _send_new_order_notifications(self, screen_ids_by_order, product_cache=None):
+        """
+        ✅ Envoie en une seule passe les notifications 'new_order'
+        de plusieurs commandes : {order_id: [screen_id, ...]}
+        """
+        try:
+            all_screen_ids = {sid for sids in screen_ids_by_order.values() for sid in sids}
+            screens = self.env['kitchen.screen'].sudo().browse(all_screen_ids).exists()
+            screens_by_id = {screen.id: screen for screen in screens}
+            orders = self.sudo().browse(list(screen_ids_by_order)).exists()
+
+            notifications = []
+            for order in orders:
+                for screen_id in screen_ids_by_order[order.id]:
+                    screen = screens_by_id.get(screen_id)
+                    if screen:
+                        notifications.append((
+                            f"kitchen.screen.{screen.id}",
+                            "new_order",
+                            self._prepare_new_order_message(screen, order, product_cache),
+                        ))
+
+            for channel, notification_type, message in notifications:
+                self._queue_kitchen_notification(channel, notification_type, message)
             _logger.info(
-                f"[KITCHEN] ✅ Notification sent to '{screen_name}' (channel: {channel})"
+                f"[KITCHEN] 🔔 {len(notifications)} notifications sent for {len(orders)} orders"
             )
 
         except Exception as e:
             _logger.error(
-                f"[KITCHEN] ❌ Error sending new order notification: {str(e)}", 
+                f"[KITCHEN] ❌ Error sending batch notifications: {str(e)}",
                 exc_info=True
             )
 
@@ -1005,47 +1428,20 @@ class PosOrder(models.Model):
     
     
     
-    def _notify_single_screen(self, screen, order, notification_type):
-        """Notifie UN SEUL écran avec uniquement SES lignes"""
-        try:
-            if not screen.exists() or not order.exists():
-                _logger.warning("[KITCHEN] Invalid screen or order for notification")
-                return
-
-            screen_categ_ids = screen.pos_categ_ids.ids
-            visible_lines = order.lines.filtered(
-                lambda line: (
-                    line.is_cooking and 
-                    line.product_id and 
-                    (set(line.product_id.pos_categ_ids.ids) & set(screen_categ_ids))
-                )
-            )
-
-            if not visible_lines:
-                _logger.warning(
-                    f"[KITCHEN] Screen {screen.id} has no visible lines for order {order.name}"
-                )
-                return
-
-            self._send_screen_notification(
-                screen, 
-                order, 
-                notification_type,
-                line_ids=visible_lines.ids
-            )
-
-            _logger.info(
-                f"[KITCHEN] Single notification sent to screen '{screen.name}' "
-                f"for order {order.name}: {notification_type}"
-            )
-
-        except Exception as e:
-            _logger.error(f"[KITCHEN] Error in _notify_single_screen: {str(e)}", exc_info=True)
-
     def write(self, vals):
         """Override write pour notifier les changements de statut"""
+        kitchen_fields = set(self._get_kitchen_order_fields()) | {'screen_ids'}
+        tracks_kitchen = bool(kitchen_fields.intersection(vals))
+        old_screen_ids = set(self.screen_ids.ids) if tracks_kitchen else set()
+
         res = super(PosOrder, self).write(vals)
 
+        # ✅ Version de contenu des écrans (avant ET après réassignation)
+        if tracks_kitchen:
+            self.env['kitchen.screen']._mark_kitchen_content_changed(
+                old_screen_ids | set(self.screen_ids.ids)
+            )
+
         try:
             if 'order_status' in vals and not self.env.context.get('skip_status_notification'):
                 for order in self:
@@ -1059,34 +1455,17 @@ class PosOrder(models.Model):
     def _notify_screens_for_order(self, order, notification_type):
         """Notifier TOUS les écrans concernés"""
         try:
-            kitchen_screens = self.env["kitchen.screen"].sudo().search([
-                ("pos_config_id", "=", order.config_id.id),
-                ("active", "=", True)
-            ])
-
-            if not kitchen_screens:
-                return
-
-            _logger.info(f"[KITCHEN] Notifying {len(kitchen_screens)} screens for order {order.name}")
-
+            # ✅ Assignation stockée ligne → écrans (pas de recherche)
             screen_lines_map = {}
 
             for line in order.lines.filtered(lambda l: l.is_cooking):
-                if not line.product_id:
-                    continue
+                for screen_id in line.kitchen_screen_ids.ids:
+                    screen_lines_map.setdefault(screen_id, []).append(line.id)
 
-                product_pos_categs = line.product_id.pos_categ_ids.ids
-
-                for screen in kitchen_screens:
-                    if not screen.exists():
-                        continue
-
-                    screen_categ_ids = screen.pos_categ_ids.ids
+            if not screen_lines_map:
+                return
 
-                    if set(product_pos_categs) & set(screen_categ_ids):
-                        if screen.id not in screen_lines_map:
-                            screen_lines_map[screen.id] = []
-                        screen_lines_map[screen.id].append(line.id)
+            _logger.info(f"[KITCHEN] Notifying {len(screen_lines_map)} screens for order {order.name}")
 
             for screen_id, line_ids in screen_lines_map.items():
                 screen = self.env["kitchen.screen"].sudo().browse(screen_id)
@@ -1113,18 +1492,11 @@ class PosOrder(models.Model):
                 return
 
             channel = f"kitchen.screen.{screen.id}"
-            screen_categ_ids = screen.pos_categ_ids.ids
 
             if line_ids:
                 visible_lines = order.lines.filtered(lambda l: l.id in line_ids)
             else:
-                visible_lines = order.lines.filtered(
-                    lambda line: (
-                        line.is_cooking and 
-                        line.product_id and 
-                        (set(line.product_id.pos_categ_ids.ids) & set(screen_categ_ids))
-                    )
-                )
+                visible_lines = self._get_visible_lines_for_screen(order, screen)
 
             if not visible_lines:
                 _logger.warning(f"[KITCHEN] No visible lines for screen {screen.id}")
@@ -1140,12 +1512,14 @@ class PosOrder(models.Model):
                 "order_name": order.name,
                 "order_ref": order.order_ref or order.name,
                 "order_status": order.order_status,
+                "table_id": order.table_id.id,
                 "table_name": order.table_id.display_name if order.table_id else None,
                 "config_id": order.config_id.id,
                 "config_name": order.config_id.name,
                 "timestamp": fields.Datetime.now().isoformat(),
                 "lines": [{
                     'id': line.id,
+                    'product_id': line.product_id.id,
                     'product_name': line.product_id.display_name,
                     'qty': line.qty,
                     'note': line.note or '',
@@ -1153,7 +1527,7 @@ class PosOrder(models.Model):
                 } for line in visible_lines if line.product_id]
             }
 
-            self.env["bus.bus"]._sendone(channel, notification_type, message)
+            self._queue_kitchen_notification(channel, notification_type, message)
 
             _logger.info(
                 f"[KITCHEN] ✉️ Notification sent to '{screen_name}' "
@@ -1202,61 +1576,186 @@ class PosOrder(models.Model):
 class PosOrderLine(models.Model):
     _inherit = 'pos.order.line'
 
+    # ✅ Assignation stockée ligne → écrans (remplie à la création de la ligne,
+    # recalculée uniquement quand le routage des écrans change)
+    kitchen_screen_ids = fields.Many2many(
+        'kitchen.screen',
+        'pos_order_line_kitchen_screen_rel',
+        'line_id',
+        'screen_id',
+        string='Kitchen Screens',
+        help='Kitchen screens where this line appears',
+        copy=False
+    )
+
+    # ✅ Identifiant de la ligne côté POS (uuid) : permet de rapprocher
+    # les lignes lors d'une nouvelle soumission au lieu de les recréer
+    kitchen_line_ref = fields.Char(
+        string='Kitchen Line Reference',
+        help='POS line identifier used to match re-submitted kitchen lines',
+        copy=False,
+        index=True
+    )
+
+    # ✅ Routage déjà effectué (même si aucun écran ne gère le produit) :
+    # évite que le rattrapage du cron ne reprenne indéfiniment ces lignes
+    kitchen_routed = fields.Boolean(
+        string='Kitchen Routed',
+        help='The line went through kitchen screen routing',
+        readonly=True,
+        copy=False
+    )
+
+    @api.model
+    def _get_kitchen_line_fields(self):
+        """
+        ✅ Schéma du payload cuisine : champs de pos.order.line envoyés aux écrans.
+        Les modules tiers peuvent étendre la liste via super().
+        """
+        return [
+            'order_id',
+            'product_id',
+            'full_product_name',
+            'qty',
+            'note',
+            'customer_note',
+            'order_status',
+            'is_cooking',
+            'write_date',
+        ]
+
+    def _read_kitchen_fields(self, field_names):
+        """Lecture groupée limitée aux champs existants du schéma cuisine"""
+        return self.read([name for name in field_names if name in self._fields])
+
+    def _get_routed_screen_ids(self):
+        """Ids des écrans actifs gérant le produit de cette ligne (index de routage)"""
+        self.ensure_one()
+        if not self.product_id:
+            return []
+        return self.env['kitchen.screen']._route_categories(
+            self.order_id.config_id.id, self.product_id.pos_categ_ids.ids
+        )
+
+    def _assign_kitchen_screens(self):
+        """
+        (Re)calcule kitchen_screen_ids via l'index de routage.
+        Une seule écriture par groupe de lignes ayant les mêmes écrans.
+        """
+        lines_by_screens = defaultdict(lambda: self.env['pos.order.line'])
+        unrouted = self.env['pos.order.line']
+        for line in self:
+            screen_ids = tuple(line._get_routed_screen_ids())
+            if set(screen_ids) != set(line.kitchen_screen_ids.ids):
+                lines_by_screens[screen_ids] |= line
+            elif not line.kitchen_routed:
+                unrouted |= line
+
+        for screen_ids, lines in lines_by_screens.items():
+            lines.sudo().write({'kitchen_screen_ids': [(6, 0, list(screen_ids))], 'kitchen_routed': True})
+        if unrouted:
+            unrouted.sudo().write({'kitchen_routed': True})
+
+        return sum(len(lines) for lines in lines_by_screens.values())
+
+    @api.model
+    def _get_open_kitchen_lines_domain(self, pos_config_ids):
+        """Domaine des lignes cuisine des commandes en cours des POS donnés"""
+        return [
+            ('is_cooking', '=', True),
+            ('order_id.is_cooking', '=', True),
+            ('order_id.config_id', 'in', list(pos_config_ids)),
+            ('order_id.state', 'not in', ['cancel', 'paid']),
+            ('order_id.order_status', '!=', 'cancel'),
+        ]
+
+    @api.model
+    def _recompute_kitchen_screens(self, pos_config_ids):
+        """Recalcule l'assignation des lignes en cours après un changement de routage"""
+        lines = self.sudo().search(self._get_open_kitchen_lines_domain(pos_config_ids))
+        updated_count = lines._assign_kitchen_screens()
+        _logger.info(
+            f"[KITCHEN] 🔁 Line screen assignment recomputed: "
+            f"{updated_count}/{len(lines)} lines updated for POS {list(pos_config_ids)}"
+        )
+        return updated_count
+
+    @api.model_create_multi
+    def create(self, vals_list):
+        """
+        Route les lignes cuisine créées sans assignation (synchronisation POS
+        standard, qui recrée les lignes d'une commande brouillon) et signale
+        les écrans concernés par les nouvelles lignes
+        """
+        lines = super().create(vals_list)
+        lines.filtered(
+            lambda l: l.is_cooking and not l.kitchen_routed and not l.kitchen_screen_ids
+        )._assign_kitchen_screens()
+        self.env['kitchen.screen']._mark_kitchen_content_changed(lines.kitchen_screen_ids.ids)
+        return lines
+
+    def unlink(self):
+        """Signale les écrans concernés par les lignes supprimées"""
+        self.env['kitchen.screen']._mark_kitchen_content_changed(self.kitchen_screen_ids.ids)
+        return super().unlink()
+
     def write(self, vals):
         """Notifier les écrans lors de modification de lignes"""
+        kitchen_fields = set(self._get_kitchen_line_fields()) | {'kitchen_screen_ids'}
+        tracks_kitchen = bool(kitchen_fields.intersection(vals))
+        old_screen_ids = set(self.kitchen_screen_ids.ids) if tracks_kitchen else set()
+
         res = super(PosOrderLine, self).write(vals)
 
+        # ✅ Version de contenu des écrans (avant ET après réassignation)
+        if tracks_kitchen:
+            self.env['kitchen.screen']._mark_kitchen_content_changed(
+                old_screen_ids | set(self.kitchen_screen_ids.ids)
+            )
+
         try:
             if 'order_status' in vals:
-                for line in self:
-                    if line.order_id and line.order_id.is_cooking:
-                        self._notify_line_change(line)
+                self.filtered(lambda l: l.order_id.is_cooking)._notify_lines_change()
         except Exception as e:
             _logger.error(f"[KITCHEN] Error in line write notification: {str(e)}", exc_info=True)
 
         return res
 
-    def _notify_line_change(self, line):
-        """Notifie TOUS les écrans concernés par cette ligne"""
+    def _notify_lines_change(self):
+        """
+        ✅ Notifie les écrans concernés par ces lignes : un message
+        'order_lines_updated' par écran et par commande, avec toutes les lignes modifiées
+        """
         try:
-            if not line.product_id:
-                return
-
-            product_pos_categs = line.product_id.pos_categ_ids.ids
-            if not product_pos_categs:
-                return
-
-            screens = self.env['kitchen.screen'].sudo().search([
-                ('pos_config_id', '=', line.order_id.config_id.id),
-                ('active', '=', True)
-            ])
-
-            screens_to_notify = screens.filtered(
-                lambda s: (
-                    s.exists() and 
-                    (set(s.pos_categ_ids.ids) & set(product_pos_categs))
-                )
-            )
-
-            for screen in screens_to_notify:
-                if not screen.exists():
-                    continue
-
+            # ✅ Écrans concernés : assignation stockée des lignes (une seule lecture)
+            lines_by_target = defaultdict(lambda: self.browse())
+            for line in self.sudo():
+                for screen in line.kitchen_screen_ids:
+                    lines_by_target[(screen, line.order_id)] |= line
+
+            timestamp = fields.Datetime.now().isoformat()
+            PosOrder = self.env["pos.order"]
+            for (screen, order), lines in lines_by_target.items():
                 channel = f"kitchen.screen.{screen.id}"
 
                 message = {
-                    "type": "order_line_updated",
+                    "type": "order_lines_updated",
                     "screen_id": screen.id,
-                    "line_id": line.id,
-                    "order_id": line.order_id.id,
-                    "order_name": line.order_id.name,
-                    "product_name": line.product_id.display_name,
-                    "qty": line.qty,
-                    "order_status": line.order_status,
-                    "timestamp": fields.Datetime.now().isoformat(),
+                    "config_id": order.config_id.id,
+                    "order_id": order.id,
+                    "order_name": order.name,
+                    "line_ids": lines.ids,
+                    "lines": [{
+                        "id": line.id,
+                        "product_id": line.product_id.id,
+                        "product_name": line.product_id.display_name,
+                        "qty": line.qty,
+                        "order_status": line.order_status,
+                    } for line in lines],
+                    "timestamp": timestamp,
                 }
 
-                self.env["bus.bus"]._sendone(channel, "order_line_updated", message)
+                PosOrder._queue_kitchen_notification(channel, "order_lines_updated", message)
 
         except Exception as e:
-            _logger.error(f"[KITCHEN] Error in _notify_line_change: {str(e)}", exc_info=True)
\ No newline at end of file
+            _logger.error(f"[KITCHEN] Error in _notify_lines_change: {str(e)}", exc_info=True)
\ No newline at end of file
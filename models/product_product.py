@@ -0,0 +1,82 @@
+# -*- coding: utf-8 -*-
+from odoo import models, api, tools
+from odoo.tools import frozendict
+import logging
+
+_logger = logging.getLogger(__name__)
+
+
+class ProductProduct(models.Model):
+    """Cache des temps de préparation utilisés par les écrans cuisine"""
+    _inherit = 'product.product'
+
+    @api.model
+    @tools.ormcache()
+    def _get_kitchen_prepare_time_index(self):
+        """
+        ✅ Index {product_id: prepair_time_minutes} des produits ayant un temps
+        de préparation. Calculé une fois par worker, invalidé à chaque
+        modification du champ (voir write/create/unlink ci-dessous).
+        """
+        if 'prepair_time_minutes' not in self._fields:
+            return frozendict()
+
+        products = self.sudo().with_context(active_test=False).search_read(
+            [('prepair_time_minutes', '!=', False)],
+            ['prepair_time_minutes'],
+        )
+        _logger.info(f"[KITCHEN] ⏱️ Prepare time index built: {len(products)} products")
+        return frozendict({p['id']: p['prepair_time_minutes'] for p in products})
+
+    @api.model
+    def _get_kitchen_prepare_times(self, product_ids):
+        """Temps de préparation au format attendu par le dashboard cuisine"""
+        index = self._get_kitchen_prepare_time_index()
+        return [
+            {'id': product_id, 'prepair_time_minutes': index.get(product_id, 0)}
+            for product_id in product_ids
+        ]
+
+    @api.model
+    def _invalidate_kitchen_prepare_times(self):
+        """Vide l'index et force le rafraîchissement des écrans cuisine"""
+        self.env.registry.clear_cache()  # index des temps de préparation
+        KitchenScreen = self.env['kitchen.screen'].sudo()
+        KitchenScreen._mark_kitchen_content_changed(KitchenScreen.search([]).ids)
+
+    @api.model_create_multi
+    def create(self, vals_list):
+        result = super().create(vals_list)
+        if any(vals.get('prepair_time_minutes') for vals in vals_list):
+            self._invalidate_kitchen_prepare_times()
+        return result
+
+    def write(self, vals):
+        result = super().write(vals)
+        if 'prepair_time_minutes' in vals:
+            self._invalidate_kitchen_prepare_times()
+        return result
+
+    def unlink(self):
+        result = super().unlink()
+        self.env.registry.clear_cache()  # index des temps de préparation
+        return result
+
+
+class ProductTemplate(models.Model):
+    """Le temps de préparation peut être saisi depuis le modèle de produit"""
+    _inherit = 'product.template'
+
+    @api.model_create_multi
+    def create(self, vals_list):
+        # Les variantes sont créées sans le champ : l'index doit être invalidé ici
+        result = super().create(vals_list)
+        if any(vals.get('prepair_time_minutes') for vals in vals_list):
+            self.env['product.product']._invalidate_kitchen_prepare_times()
+        return result
+
+    def write(self, vals):
+        result = super().write(vals)
+        if 'prepair_time_minutes' in vals:
+            self.env['product.product']._invalidate_kitchen_prepare_times()
+        return result
@@ -1,6 +1,7 @@
 /** @odoo-module */
 import { patch } from "@web/core/utils/patch";
 import { registry } from "@web/core/registry";
+import { onMounted } from "@odoo/owl";
 
 // Récupération de l'action de base
 let KitchenScreenDashboard;
@@ -14,6 +15,26 @@ try {
     throw new Error('Kitchen base action not found. Make sure the base module is loaded first.');
 }
 
+// Polling adaptatif : sonde lente tant que le bus est sain, backoff exponentiel sinon
+const KITCHEN_BUS_STALE_MS = 90000;
+const KITCHEN_HEALTHY_PROBE_MS = 60000;
+const KITCHEN_POLL_MIN_MS = 5000;
+const KITCHEN_POLL_MAX_MS = 60000;
+
+// Format compact des messages bus (voir _encode_kitchen_message côté serveur)
+// v3 : delta compact (valeurs positionnelles, ids, dates epoch) ; v2 encore décodé
+const KITCHEN_BUS_SCHEMA_VERSION = 3;
+const KITCHEN_BUS_SUPPORTED_VERSIONS = [2, KITCHEN_BUS_SCHEMA_VERSION];
+const KITCHEN_DICTIONARY_REFRESH_MS = 60000;
+
+// Countdowns : un seul ticker aligné sur la seconde pour toutes les commandes
+const KITCHEN_COUNTDOWN_TICK_MS = 1000;
+const KITCHEN_COUNTDOWN_STORAGE_PREFIX = 'kitchen_countdowns_';
+
+// Rendu fenêtré : tickets montés par statut, agrandi par pas au défilement
+const KITCHEN_RENDER_WINDOW = 30;
+const KITCHEN_RENDER_STEP = 30;
+
 // Stockage en mémoire global
 const screenMemoryStore = {
     currentScreenId: null,
@@ -169,18 +190,38 @@ patch(KitchenScreenDashboard.prototype, {
         this._globalEventHandler = this.handleGlobalEvent.bind(this);
         window.addEventListener('kitchen-new-order-global', this._globalEventHandler);
         
-        // ✅ ÉCOUTE CANAL 4: Backend bus
+        // ✅ ÉCOUTE CANAL 4: Backend bus (+ dictionnaire de décodage des messages compacts)
+        this._busDictionary = null;
+        this._busDictionaryLoadedAt = 0;
+        this._loadBusDictionary();
         this._setupBackendBusListener();
         
         // ✅ INTERACTION UTILISATEUR pour débloquer l'audio
         this._setupUserInteractionListener();
         
-        // ✅ POLLING DE SECOURS (toutes les 15 secondes)
-        console.log('[KITCHEN EXT] ⏰ Setting up backup polling (15s)');
+        // ✅ POLLING DE SECOURS ADAPTATIF (uniquement si le bus semble inactif)
+        console.log('[KITCHEN EXT] ⏰ Setting up adaptive backup polling');
         this._lastOrderCount = 0;
-        this._pollingInterval = setInterval(() => {
-            this.checkForNewOrders();
-        }, 15000);
+        this._initKitchenStore();
+        this._renderLimit = KITCHEN_RENDER_WINDOW;
+        this._scrollFrame = null;
+        this._ticketScroller = null;
+        this._dashboardEl = null;
+        onMounted(() => {
+            const node = this.__owl__?.firstNode?.();
+            this._dashboardEl = node instanceof Element ? node : node?.parentElement || null;
+        });
+        this._scrollHandler = this._onKitchenScroll.bind(this);
+        document.addEventListener('scroll', this._scrollHandler, { capture: true, passive: true });
+        this._initCountdowns();
+        this._kitchenCursor = null;
+        this._kitchenVersion = null;
+        this._lastSeq = null;
+        this._resyncing = false;
+        this._pendingSeqMessages = [];
+        this._pollDelay = KITCHEN_POLL_MIN_MS;
+        this._pollTimeout = null;
+        this._schedulePoll(KITCHEN_POLL_MIN_MS);
         
         console.log(`[KITCHEN EXT] ✅ Screen initialized with ID: ${this.screenId}`);
         console.log(`[KITCHEN EXT] ✅ Channel: ${this.screenChannel}`);
@@ -204,6 +245,13 @@ _setupBackendBusListener() {
             
             // S'abonner aux notifications
             this._busService.addEventListener('notification', this._handleBackendNotificationEvent.bind(this));
+
+            // ✅ Santé du bus : connexion / déconnexion du websocket
+            this._busConnected = true;
+            this._lastBusActivity = Date.now();
+            this._busService.addEventListener('connect', () => this._onBusConnectionChange(true));
+            this._busService.addEventListener('reconnect', () => this._onBusConnectionChange(true));
+            this._busService.addEventListener('disconnect', () => this._onBusConnectionChange(false));
         } else {
             console.warn('[KITCHEN EXT] ⚠️ Bus service not available');
         }
@@ -228,6 +276,83 @@ _setupBackendBusListener() {
         }
     },
 
+    /**
+     * ✅ Le bus est considéré sain s'il est connecté et a donné signe de vie récemment
+     */
+    _isBusHealthy() {
+        return Boolean(
+            this._busService &&
+            this._busConnected &&
+            Date.now() - (this._lastBusActivity || 0) < KITCHEN_BUS_STALE_MS
+        );
+    },
+
+    _onBusConnectionChange(connected) {
+        console.log(`[KITCHEN EXT] 📡 Bus ${connected ? 'connected' : 'disconnected'}`);
+        this._busConnected = connected;
+        if (connected) {
+            this._lastBusActivity = Date.now();
+            // Des messages ont pu être perdus pendant la coupure : sonde immédiate
+            this._pollDelay = KITCHEN_POLL_MIN_MS;
+            this._schedulePoll(0);
+        }
+    },
+
+    _schedulePoll(delay) {
+        if (this._pollingStopped) {
+            return;
+        }
+        if (this._pollTimeout) {
+            clearTimeout(this._pollTimeout);
+        }
+        this._pollTimeout = setTimeout(() => this._pollTick(), delay);
+    },
+
+    /**
+     * ✅ Sonde "quelque chose a changé ?" (version + séquence) avant tout rechargement.
+     * Bus sain : sonde lente (heartbeat). Bus inactif : backoff exponentiel,
+     * remis au minimum dès qu'un changement est détecté.
+     */
+    async _pollTick() {
+        const busHealthy = this._isBusHealthy();
+        let changed = false;
+        try {
+            if (this._kitchenVersion === null || this._kitchenVersion === undefined) {
+                // Pas encore d'état local : chargement complet
+                changed = true;
+                await this.checkForNewOrders();
+            } else {
+                const state = await this.orm.call("kitchen.screen", "get_kitchen_state", [this.screenId]);
+                if (state && typeof state.seq === 'number' && this._lastSeq !== null && state.seq > this._lastSeq) {
+                    // Messages bus manqués : ne récupérer que ceux-là
+                    changed = true;
+                    await this._resyncFrom(this._lastSeq);
+                } else if (state && state.version !== this._kitchenVersion) {
+                    changed = true;
+                    await this.checkForNewOrders();
+                }
+            }
+            if (changed) {
+                // La sonde a trouvé un changement que le bus n'a pas livré :
+                // bus considéré inactif, retour au backoff court
+                this._lastBusActivity = 0;
+            }
+        } catch (error) {
+            console.warn('[KITCHEN EXT] ⚠️ Probe failed:', error);
+        }
+
+        // Une sonde réussie n'est pas une activité du bus : seuls les messages
+        // reçus (et la (re)connexion) prolongent l'état sain
+        if (!changed && busHealthy) {
+            this._pollDelay = KITCHEN_POLL_MIN_MS;
+            this._schedulePoll(KITCHEN_HEALTHY_PROBE_MS);
+        } else {
+            this._pollDelay = changed ? KITCHEN_POLL_MIN_MS : Math.min(this._pollDelay * 2, KITCHEN_POLL_MAX_MS);
+            console.log(`[KITCHEN EXT] ⏰ Bus stale - next probe in ${this._pollDelay / 1000}s`);
+            this._schedulePoll(this._pollDelay);
+        }
+    },
+
     /**
      * ✅ NOUVEAU: Vérification polling pour détecter les nouvelles commandes
      */
@@ -236,7 +361,7 @@ _setupBackendBusListener() {
             console.log('[KITCHEN EXT] ⏰ Polling check for new orders...');
             
             // Compter les commandes actuelles
-            const currentOrderCount = this.state.order_details?.length || 0;
+            const currentOrderCount = this._store.orders.size;
             
             // Si le nombre a augmenté, il y a une nouvelle commande
             if (currentOrderCount > this._lastOrderCount) {
@@ -269,6 +394,7 @@ _setupBackendBusListener() {
     _handleBackendNotificationEvent(event) {
     try {
         console.log('[KITCHEN EXT] 📨 Backend notification event received:', event);
+        this._lastBusActivity = Date.now();
 
         let notifications = event.detail || event.data || [];
         if (!Array.isArray(notifications)) {
@@ -297,16 +423,13 @@ _setupBackendBusListener() {
                 continue;
             }
 
+            message = this._decodeKitchenMessage(message);
+            messageType = message?.type || messageType;
+
             console.log('[KITCHEN EXT] 📬 Processing notification:', { channel, messageType, message });
 
             if (channel === this.screenChannel) {
-                if (messageType === 'new_order' || message?.type === 'new_order') {
-                    this.handleNewOrderNotification({ detail: message });
-                } else if (messageType === 'order_status_change') {
-                    this.handleOrderStatusChange({ detail: message });
-                } else {
-                    this.onPosOrderCreation?.(message);
-                }
+                this._receiveScreenMessage(messageType, message);
             } else {
                 console.log(`[KITCHEN EXT] 📭 Notification for different channel: ${channel}`);
             }
@@ -317,6 +440,229 @@ _setupBackendBusListener() {
 },
 
 
+    /**
+     * ✅ Contrôle de séquence : chaque message de l'écran porte un numéro
+     * croissant. Doublon → ignoré, trou → resync des seuls messages manqués.
+     */
+    _receiveScreenMessage(messageType, message) {
+        const seq = message?.seq;
+        if (seq) {
+            if (this._resyncing) {
+                this._pendingSeqMessages.push([messageType, message]);
+                return;
+            }
+            if (this._lastSeq !== null) {
+                if (seq <= this._lastSeq) {
+                    console.log(`[KITCHEN EXT] ♻️ Duplicate message #${seq} ignored`);
+                    return;
+                }
+                if (seq > this._lastSeq + 1) {
+                    console.warn(`[KITCHEN EXT] ⚠️ Sequence gap: #${this._lastSeq} → #${seq}`);
+                    this._pendingSeqMessages.push([messageType, message]);
+                    this._resyncFrom(this._lastSeq);
+                    return;
+                }
+            }
+            this._lastSeq = seq;
+        }
+        this._dispatchScreenMessage(messageType, message);
+    },
+
+    _dispatchScreenMessage(messageType, message) {
+        // ✅ Delta prêt à afficher : pas d'aller-retour get_details
+        if (message?.kitchen_delta) {
+            message._deltaApplied = this._applyKitchenDelta(message.kitchen_delta);
+        }
+
+        if (messageType === 'new_order' || message?.type === 'new_order') {
+            this.handleNewOrderNotification({ detail: message });
+        } else if (messageType === 'order_status_change') {
+            this.handleOrderStatusChange({ detail: message });
+        } else {
+            this.onPosOrderCreation?.(message);
+        }
+    },
+
+    /**
+     * ✅ Récupère les messages manqués depuis fromSeq (kitchen.screen.resync).
+     * Si le journal ne les contient plus, rechargement complet via get_details.
+     */
+    async _resyncFrom(fromSeq) {
+        if (this._resyncing) {
+            return;
+        }
+        this._resyncing = true;
+        try {
+            const result = await this.orm.call("kitchen.screen", "resync", [this.screenId, fromSeq]);
+            if (!result?.complete) {
+                console.warn('[KITCHEN EXT] ⚠️ Resync incomplete - full reload');
+                this._lastSeq = result?.last_seq ?? null;
+                this._kitchenCursor = null;
+                this._kitchenVersion = null;
+                this.loadOrders();
+            } else {
+                console.log(`[KITCHEN EXT] 🔁 Resync: ${result.events.length} missed messages`);
+                for (const event of result.events) {
+                    if (this._lastSeq !== null && event.seq <= this._lastSeq) {
+                        continue;
+                    }
+                    this._lastSeq = event.seq;
+                    const message = this._decodeKitchenMessage(event.message);
+                    this._dispatchScreenMessage(message?.type || event.type, message);
+                }
+            }
+        } catch (error) {
+            console.error('[KITCHEN EXT] ❌ Resync failed:', error);
+            this._lastSeq = null;
+            this.loadOrders();
+        } finally {
+            this._resyncing = false;
+            const pending = this._pendingSeqMessages.splice(0);
+            for (const [messageType, message] of pending) {
+                this._receiveScreenMessage(messageType, message);
+            }
+        }
+    },
+
+    /**
+     * ✅ Charge le dictionnaire id → nom utilisé par les messages bus compacts
+     */
+    async _loadBusDictionary() {
+        if (!this.screenId) {
+            return;
+        }
+        this._busDictionaryLoadedAt = Date.now();
+        try {
+            this._busDictionary = await this.orm.call(
+                "kitchen.screen",
+                "get_kitchen_bus_dictionary",
+                [this.screenId]
+            );
+            console.log('[KITCHEN EXT] 📖 Bus dictionary loaded:', {
+                products: Object.keys(this._busDictionary?.products || {}).length,
+                tables: Object.keys(this._busDictionary?.tables || {}).length,
+            });
+        } catch (error) {
+            console.warn('[KITCHEN EXT] ⚠️ Bus dictionary unavailable:', error);
+        }
+    },
+
+    _lookupBusName(section, id) {
+        if (!id) {
+            return null;
+        }
+        const name = this._busDictionary?.[section]?.[id];
+        if (name !== undefined) {
+            return name;
+        }
+        // Id inconnu (produit créé depuis) : rafraîchir le dictionnaire, au plus une fois par minute
+        if (Date.now() - this._busDictionaryLoadedAt > KITCHEN_DICTIONARY_REFRESH_MS) {
+            this._loadBusDictionary();
+        }
+        return `#${id}`;
+    },
+
+    /**
+     * ✅ Décodeur de compatibilité : convertit un message compact (v2/v3) au format
+     * historique (clés longues, noms résolus). Les anciens messages passent tels quels.
+     */
+    _decodeKitchenMessage(message) {
+        if (message?.payload?._v) {
+            message = message.payload;
+        }
+        if (!message || !KITCHEN_BUS_SUPPORTED_VERSIONS.includes(message._v)) {
+            return message;
+        }
+        const delta = message._v === KITCHEN_BUS_SCHEMA_VERSION
+            ? this._decodeKitchenDelta(message.d, message.o)
+            : message.d;
+        const deltaOrder = delta?.order;
+
+        const lines = (message.l || []).map(([id, productId, qty, orderStatus, note]) => ({
+            id,
+            product_id: productId,
+            product_name: this._lookupBusName('products', productId),
+            qty,
+            order_status: orderStatus,
+            note: note || '',
+        }));
+
+        return {
+            type: message.t,
+            screen_id: message.s,
+            screen_name: this._lookupBusName('screens', message.s),
+            config_id: message.c,
+            config_name: this._lookupBusName('configs', message.c),
+            order_id: message.o,
+            order_name: message.n ?? deltaOrder?.name,
+            order_reference: message.r ?? deltaOrder?.pos_reference,
+            order_ref: message.n ?? deltaOrder?.order_ref ?? deltaOrder?.name,
+            order_status: message.st,
+            table_id: message.tb || null,
+            table_name: this._lookupBusName('tables', message.tb),
+            timestamp: message.ts ? new Date(message.ts * 1000).toISOString() : null,
+            lines,
+            line_ids: lines.map(line => line.id),
+            lines_count: lines.length,
+            kitchen_delta: delta,
+            seq: message.q,
+        };
+    },
+
+    /**
+     * ✅ Delta compact (v3) → commande et lignes au format get_details, d'après
+     * le schéma du dictionnaire bus. Retourne null si le schéma manque ou ne
+     * correspond pas : la notification repasse alors par un rechargement.
+     */
+    _decodeKitchenDelta(delta, orderId) {
+        if (!delta) {
+            return null;
+        }
+        const schema = this._busDictionary?.delta_schema;
+        const width = schema?.order?.fields?.length;
+        if (!schema || (delta.od && delta.od.length !== width)
+            || (delta.l || []).some(values => values.length !== schema.line.fields.length)) {
+            console.warn('[KITCHEN EXT] ⚠️ Delta schema missing or mismatched - reload');
+            if (Date.now() - this._busDictionaryLoadedAt > KITCHEN_DICTIONARY_REFRESH_MS) {
+                this._loadBusDictionary();
+            }
+            return null;
+        }
+
+        const order = delta.od ? this._decodeKitchenRecord(delta.od, schema.order, null) : null;
+        if (order) {
+            order.formatted_minutes = String(order.minutes ?? 0).padStart(2, '0');
+            if (Array.isArray(order.table_id) && order.table_id[1]) {
+                order.floor = order.table_id[1].split(',')[0].trim();
+            }
+        }
+        return {
+            version: delta.v,
+            base_version: delta.bv,
+            order_id: orderId,
+            order,
+            order_lines: (delta.l || []).map(values => this._decodeKitchenRecord(values, schema.line, order)),
+            prepare_times: (delta.p || []).map(([id, minutes]) => ({ id, prepair_time_minutes: minutes })),
+        };
+    },
+
+    _decodeKitchenRecord(values, schema, order) {
+        const record = {};
+        schema.fields.forEach((name, index) => {
+            let value = values[index];
+            const section = schema.refs[name];
+            if (section && value) {
+                // Paire [id, nom] reconstruite (la commande du delta pour order_id)
+                const label = section === 'order' ? (order?.name ?? `#${value}`) : this._lookupBusName(section, value);
+                value = [value, label];
+            } else if (schema.dates.includes(name) && value) {
+                value = new Date(value * 1000).toISOString().replace('T', ' ').slice(0, 19);
+            }
+            record[name] = value;
+        });
+        return record;
+    },
+
     /**
      * ✅ NOUVEAU: Écouter le premier clic utilisateur pour débloquer l'audio
      */
@@ -410,6 +756,9 @@ _setupBackendBusListener() {
     handleOrderStatusChange(event) {
         const message = event.detail;
         console.log('[KITCHEN EXT] 🔄 Order status change:', message);
+        if (message?._deltaApplied) {
+            return;
+        }
         
         // Recharger les commandes après un court délai
         setTimeout(() => {
@@ -431,9 +780,11 @@ _setupBackendBusListener() {
             console.log(`[KITCHEN EXT] 🚨 TRIGGERING INSTANT NEW ORDER ALERT`);
             console.log(`[KITCHEN EXT] 🚨 ========================================`);
             
-            // ✅ CHANGEMENT CRITIQUE: Recharger IMMÉDIATEMENT
-            console.log('[KITCHEN EXT] 🔄 Reloading orders IMMEDIATELY...');
-            this.loadOrders(); // ✅ PAS de await - lancer immédiatement
+            // ✅ CHANGEMENT CRITIQUE: Recharger IMMÉDIATEMENT (sauf si le delta du bus a suffi)
+            if (!message?._deltaApplied) {
+                console.log('[KITCHEN EXT] 🔄 Reloading orders IMMEDIATELY...');
+                this.loadOrders(); // ✅ PAS de await - lancer immédiatement
+            }
             
             // ✅ ENSUITE: Alertes visuelles/sonores en parallèle (ne bloquent rien)
             console.log('[KITCHEN EXT] 🔔 Playing sound...');
@@ -682,10 +1033,61 @@ _setupBackendBusListener() {
         return parsedId;
     },
 
+    /**
+     * ✅ Normalise les temps de préparation pour le template
+     */
+    _formatPrepareTimes(items) {
+        return items.map(item => {
+            const prepareTime = !item.prepair_time_minutes ? "00:00:00" :
+                typeof item.prepair_time_minutes === 'number' ?
+                parseFloat(item.prepair_time_minutes.toFixed(2)) :
+                item.prepair_time_minutes;
+            
+            return {
+                ...item,
+                prepare_time: prepareTime
+            };
+        });
+    },
+
+    /**
+     * Repli : ancien serveur sans prepare_times dans get_details
+     */
+    async _fetchPrepareTimes(lines) {
+        console.log(`[KITCHEN EXT] ⏱️ Fetching preparation times...`);
+        
+        const productIds = [...new Set(lines.map(line => {
+            if (Array.isArray(line.product_id)) {
+                return line.product_id[0];
+            } else if (typeof line.product_id === 'object' && line.product_id !== null) {
+                return line.product_id.id;
+            } else {
+                return line.product_id;
+            }
+        }).filter(id => id))];
+
+        if (productIds.length === 0) {
+            this.state.prepare_times = [];
+            return;
+        }
+
+        try {
+            const overTimes = await this.orm.call(
+                "product.product",
+                "search_read",
+                [[["id", "in", productIds]], ["id", "prepair_time_minutes"]]
+            );
+            this.state.prepare_times = this._formatPrepareTimes(overTimes);
+            console.log(`[KITCHEN EXT] ✅ Received ${overTimes.length} preparation times`);
+        } catch (timeError) {
+            console.error('[KITCHEN EXT] ❌ Error fetching preparation times:', timeError);
+            this.state.prepare_times = [];
+        }
+    },
+
     /**
      * ✅ CORRECTION MAJEURE: Chargement des commandes avec filtrage Many2many
      */
-   
     async loadOrders() {
         console.log(`\n${'='.repeat(80)}`);
         console.log(`[KITCHEN EXT] 🚀 LOAD_ORDERS STARTED`);
@@ -694,8 +1096,9 @@ _setupBackendBusListener() {
 
         if (!this.screenId || this.screenId === 0) {
             console.error('[KITCHEN EXT] ❌ CRITICAL: Cannot load orders - invalid screen_id');
-            this.state.order_details = [];
-            this.state.lines = [];
+            this._resetKitchenStore();
+            this._kitchenCursor = null;
+            this._kitchenVersion = null;
             return;
         }
 
@@ -704,20 +1107,35 @@ _setupBackendBusListener() {
             return;
         }
 
+        let needsFullReload = false;
+
         try {
             this.state.isLoading = true;
             
-            console.log(`[KITCHEN EXT] 📥 Calling RPC: get_details(${this.currentShopId}, ${this.screenId})`);
+            console.log(`[KITCHEN EXT] 📥 Calling RPC: get_details(${this.currentShopId}, ${this.screenId}, cursor=${this._kitchenCursor || null}, version=${this._kitchenVersion ?? null})`);
             
-            // ✅ APPEL RPC
+            // ✅ APPEL RPC (avec curseur => delta, avec version => "unchanged" si rien n'a bougé)
             const result = await this.orm.call(
                 "pos.order", 
                 "get_details", 
-                [this.currentShopId, this.screenId]
+                [this.currentShopId, this.screenId],
+                {
+                    cursor: this._kitchenCursor || null,
+                    version: this._kitchenVersion ?? null,
+                }
             );
 
+            // ✅ CONTENU INCHANGÉ : rien à sérialiser ni à re-rendre
+            this._syncLastSeq(result?.seq);
+
+            if (result?.unchanged) {
+                console.log(`[KITCHEN EXT] 💤 Screen content unchanged (version ${result.version})`);
+                return;
+            }
+
             console.log('[KITCHEN EXT] 📦 RPC Response received:', {
                 resultType: typeof result,
+                isDelta: !!result?.is_delta,
                 ordersCount: result?.orders?.length || 0,
                 linesCount: result?.order_lines?.length || 0,
                 screenInfo: {
@@ -730,33 +1148,54 @@ _setupBackendBusListener() {
             // ✅ VALIDATION
             if (!result || typeof result !== 'object') {
                 console.error('[KITCHEN EXT] ❌ Invalid RPC response');
-                this.state.order_details = [];
-                this.state.lines = [];
+                this._resetKitchenStore();
+                this._kitchenCursor = null;
+                this._kitchenVersion = null;
                 return;
             }
 
             if (result.error) {
                 console.error('[KITCHEN EXT] ❌ Backend error:', result.error);
-                this.state.order_details = [];
-                this.state.lines = [];
+                this._resetKitchenStore();
+                this._kitchenCursor = null;
+                this._kitchenVersion = null;
                 return;
             }
 
             // ✅ EXTRACTION DIRECTE (le backend a déjà tout filtré !)
             const orders = result.orders || [];
             const lines = result.order_lines || [];
+            const orderIds = result.is_delta ? (result.order_ids || []) : orders.map(o => o.id);
+            const lineIds = result.is_delta ? (result.line_ids || []) : lines.map(l => l.id);
+
+            // ✅ MODE DELTA : chaque id visible doit être connu localement ou fourni par le delta
+            if (result.is_delta) {
+                const changedOrderIds = new Set(orders.map(o => o.id));
+                const changedLineIds = new Set(lines.map(l => l.id));
+                const unknownOrder = orderIds.some(id => !changedOrderIds.has(id) && !this._store.orders.has(id));
+                const unknownLine = lineIds.some(id => !changedLineIds.has(id) && !this._store.lines.has(id));
+
+                if (unknownOrder || unknownLine) {
+                    console.warn('[KITCHEN EXT] ⚠️ Delta references unknown records - full reload required');
+                    this._kitchenCursor = null;
+                    this._kitchenVersion = null;
+                    needsFullReload = true;
+                    return;
+                }
+            }
+
+            this._kitchenCursor = result.cursor || null;
+            this._kitchenVersion = result.version ?? null;
             
-            console.log(`[KITCHEN EXT] 📊 Backend returned ${orders.length} orders, ${lines.length} lines`);
+            console.log(`[KITCHEN EXT] 📊 Backend returned ${orders.length} orders, ${lines.length} lines${result.is_delta ? ' (delta)' : ''}`);
 
-            // ✅ PAS DE FILTRAGE SUPPLÉMENTAIRE !
-            // Le backend a déjà fait tout le travail
-            this.state.order_details = orders;
-            this.state.lines = lines;
+            // ✅ PATCH DU STORE : seuls les enregistrements modifiés sont touchés
+            const changedOrders = this._patchKitchenStore(orders, lines, orderIds, lineIds);
 
-            // ✅ Logs détaillés des commandes reçues
-            if (orders.length > 0) {
-                console.log(`[KITCHEN EXT] 📋 Orders for this screen:`);
-                orders.forEach(order => {
+            // ✅ Logs détaillés des commandes modifiées
+            if (orderIds.length > 0) {
+                console.log(`[KITCHEN EXT] 📋 ${changedOrders.length} orders changed on this screen:`);
+                changedOrders.forEach(order => {
                     console.log(
                         `  - ${order.name}: status=${order.order_status}, ` +
                         `screens=${JSON.stringify(order.screen_ids)}`
@@ -766,82 +1205,19 @@ _setupBackendBusListener() {
                 console.warn(`[KITCHEN EXT] ⚠ NO orders for this screen`);
             }
 
-            // ✅ Récupération des temps de préparation
-            console.log(`[KITCHEN EXT] ⏱️ Fetching preparation times...`);
-            
-            const productIds = [...new Set(lines.map(line => {
-                if (Array.isArray(line.product_id)) {
-                    return line.product_id[0];
-                } else if (typeof line.product_id === 'object' && line.product_id !== null) {
-                    return line.product_id.id;
-                } else {
-                    return line.product_id;
-                }
-            }).filter(id => id))];
-
-            console.log(`[KITCHEN EXT]   - Unique product IDs: [${productIds.join(', ')}]`);
-
-            if (productIds.length > 0) {
-                try {
-                    const overTimes = await this.orm.call(
-                        "product.product",
-                        "search_read",
-                        [[["id", "in", productIds]], ["id", "prepair_time_minutes"]]
-                    );
-
-                    this.state.prepare_times = overTimes.map(item => {
-                        const prepareTime = !item.prepair_time_minutes ? "00:00:00" :
-                            typeof item.prepair_time_minutes === 'number' ?
-                            parseFloat(item.prepair_time_minutes.toFixed(2)) :
-                            item.prepair_time_minutes;
-                        
-                        return {
-                            ...item,
-                            prepare_time: prepareTime
-                        };
-                    });
-                    
-                    console.log(`[KITCHEN EXT] ✅ Received ${overTimes.length} preparation times`);
-                } catch (timeError) {
-                    console.error('[KITCHEN EXT] ❌ Error fetching preparation times:', timeError);
-                    this.state.prepare_times = [];
-                }
+            // ✅ Temps de préparation : fournis par get_details (une seule requête)
+            if (Array.isArray(result.prepare_times)) {
+                this.state.prepare_times = this._formatPrepareTimes(result.prepare_times);
+                console.log(`[KITCHEN EXT] ⏱️ Received ${result.prepare_times.length} preparation times`);
             } else {
-                this.state.prepare_times = [];
+                await this._fetchPrepareTimes([...this._store.lines.values()]);
             }
 
-            // ✅ Calcul des compteurs (basés sur les commandes reçues)
-            this.state.draft_count = orders.filter(o => o.order_status === 'draft').length;
-            this.state.waiting_count = orders.filter(o => o.order_status === 'waiting').length;
-            this.state.ready_count = orders.filter(o => o.order_status === 'ready').length;
-
-            console.log(`[KITCHEN EXT] 📊 Order counts:`);
-            console.log(`  - Draft: ${this.state.draft_count}`);
-            console.log(`  - Waiting: ${this.state.waiting_count}`);
-            console.log(`  - Ready: ${this.state.ready_count}`);
-            console.log(`  - Total visible: ${orders.length}`);
-
-            // ✅ Gestion des countdowns
-            console.log(`[KITCHEN EXT] ⏰ Managing countdowns...`);
-            
-            orders.forEach(order => {
-                if (order.order_status === 'waiting' && order.avg_prepare_time) {
-                    if (!this.countdownIntervals[order.id]) {
-                        console.log(`[KITCHEN EXT]   → Starting countdown for order ${order.id}`);
-                        this.startCountdown(order.id, order.avg_prepare_time, order.config_id);
-                    }
-                } else if (order.order_status === 'ready') {
-                    this.updateCountdownState(order.id, 0, true);
-                    if (this.countdownIntervals[order.id]) {
-                        clearInterval(this.countdownIntervals[order.id]);
-                        delete this.countdownIntervals[order.id];
-                    }
-                }
-            });
+            this._refreshKitchenDerivedState(changedOrders);
 
             console.log(`\n${'='.repeat(80)}`);
             console.log(`[KITCHEN EXT] ✅ LOAD_ORDERS COMPLETED SUCCESSFULLY`);
-            console.log(`[KITCHEN EXT] 📊 FINAL: ${orders.length} orders visible on this screen`);
+            console.log(`[KITCHEN EXT] 📊 FINAL: ${this._store.orders.size} orders visible on this screen`);
             console.log(`${'='.repeat(80)}\n`);
 
         } catch (error) {
@@ -849,17 +1225,463 @@ _setupBackendBusListener() {
             console.error("[KITCHEN EXT] ❌ CRITICAL ERROR in loadOrders:", error);
             console.error(`${'='.repeat(80)}\n`);
             
-            this.state.order_details = [];
-            this.state.lines = [];
+            this._resetKitchenStore();
             this.state.prepare_times = [];
-            this.state.draft_count = 0;
-            this.state.waiting_count = 0;
-            this.state.ready_count = 0;
+            this._kitchenCursor = null;
+            this._kitchenVersion = null;
         } finally {
             this.state.isLoading = false;
+            if (needsFullReload) {
+                this.loadOrders();
+            }
         }
     },
 
+    /**
+     * ✅ Séquence de référence : get_details reflète tous les messages jusqu'à `seq`
+     */
+    _syncLastSeq(seq) {
+        if (typeof seq === 'number' && (this._lastSeq === null || seq > this._lastSeq)) {
+            this._lastSeq = seq;
+        }
+    },
+
+    /**
+     * ✅ Compteurs (tenus à jour par le store) et countdowns des commandes modifiées
+     */
+    _refreshKitchenDerivedState(changedOrders) {
+        const counts = this._store.counts;
+        this.state.draft_count = counts.draft;
+        this.state.waiting_count = counts.waiting;
+        this.state.ready_count = counts.ready;
+
+        console.log(
+            `[KITCHEN EXT] 📊 Order counts: draft=${counts.draft}, waiting=${counts.waiting}, ` +
+            `ready=${counts.ready}, visible=${this._store.orders.size}`
+        );
+
+        // ✅ Gestion des countdowns (uniquement pour les commandes modifiées)
+        changedOrders.forEach(order => {
+            if (order.order_status === 'waiting' && order.avg_prepare_time) {
+                if (!this._countdowns.has(order.id)) {
+                    console.log(`[KITCHEN EXT]   → Starting countdown for order ${order.id}`);
+                    this.startCountdown(order.id, order.avg_prepare_time, order.config_id);
+                }
+            } else if (order.order_status === 'ready') {
+                this._stopCountdown(order.id);
+                this.updateCountdownState(order.id, 0, true);
+            }
+        });
+
+        // Heures de début des commandes qui ont quitté l'écran
+        const staleStarts = Object.keys(this._countdownStarts)
+            .filter(orderId => !this._store.orders.has(Number(orderId)));
+        if (staleStarts.length) {
+            staleStarts.forEach(orderId => delete this._countdownStarts[orderId]);
+            this._saveCountdownStarts();
+        }
+    },
+
+    /**
+     * ✅ Countdowns : heure de début par commande (persistée par écran pour
+     * survivre à un rechargement) et un seul ticker pour toutes les commandes.
+     */
+    _initCountdowns() {
+        this._countdowns = new Map();
+        this._countdownTimer = null;
+        this._countdownStorageKey = `${KITCHEN_COUNTDOWN_STORAGE_PREFIX}${this.screenId}`;
+        try {
+            this._countdownStarts = JSON.parse(localStorage.getItem(this._countdownStorageKey)) || {};
+        } catch {
+            this._countdownStarts = {};
+        }
+    },
+
+    _saveCountdownStarts() {
+        try {
+            localStorage.setItem(this._countdownStorageKey, JSON.stringify(this._countdownStarts));
+        } catch (error) {
+            console.warn('[KITCHEN EXT] ⚠️ Cannot persist countdowns:', error);
+        }
+    },
+
+    /**
+     * ✅ Remplace le setInterval par commande du module de base :
+     * la commande est simplement inscrite auprès du ticker partagé.
+     */
+    startCountdown(orderId, prepareTime, configId) {
+        if (!this._countdownStarts[orderId]) {
+            this._countdownStarts[orderId] = Date.now();
+            this._saveCountdownStarts();
+        }
+        const countdown = {
+            startedAt: this._countdownStarts[orderId],
+            durationMs: prepareTime * 60000,
+            configId,
+            remaining: null,
+        };
+        this._countdowns.set(orderId, countdown);
+        this._tickCountdown(orderId, countdown, Date.now());
+        this._scheduleCountdownTick();
+    },
+
+    _stopCountdown(orderId) {
+        this._countdowns.delete(orderId);
+        if (this.countdownIntervals?.[orderId]) {
+            clearInterval(this.countdownIntervals[orderId]);
+            delete this.countdownIntervals[orderId];
+        }
+        if (orderId in this._countdownStarts) {
+            delete this._countdownStarts[orderId];
+            this._saveCountdownStarts();
+        }
+    },
+
+    _scheduleCountdownTick() {
+        if (this._countdownTimer || !this._countdowns.size) {
+            return;
+        }
+        // Aligné sur la seconde : toutes les commandes changent dans le même rendu
+        const delay = KITCHEN_COUNTDOWN_TICK_MS - (Date.now() % KITCHEN_COUNTDOWN_TICK_MS);
+        this._countdownTimer = setTimeout(() => {
+            this._countdownTimer = null;
+            this._tickCountdowns();
+            this._scheduleCountdownTick();
+        }, delay);
+    },
+
+    /**
+     * ✅ Une passe pour toutes les commandes : seul un compte à rebours dont
+     * la valeur affichée change est écrit dans le state.
+     */
+    _tickCountdowns() {
+        const now = Date.now();
+        for (const [orderId, countdown] of this._countdowns) {
+            if (!this._store.orders.has(orderId)) {
+                // Désinscription seulement : l'heure de début est conservée (un
+                // chargement en échec vide le store) et n'est purgée qu'après un
+                // chargement réussi, par _refreshKitchenDerivedState
+                this._countdowns.delete(orderId);
+                continue;
+            }
+            this._tickCountdown(orderId, countdown, now);
+        }
+    },
+
+    _tickCountdown(orderId, countdown, now) {
+        const remaining = Math.max(0, Math.ceil((countdown.startedAt + countdown.durationMs - now) / 1000));
+        if (remaining === countdown.remaining) {
+            return;
+        }
+        countdown.remaining = remaining;
+        this.updateCountdownState(orderId, remaining, remaining === 0);
+        if (remaining === 0) {
+            console.log(`[KITCHEN EXT] ⏰ Countdown finished for order ${orderId}`);
+            this._countdowns.delete(orderId);
+        }
+    },
+
+    /**
+     * ✅ Applique un delta reçu sur le bus (commande + lignes projetées comme get_details).
+     * Retourne true si la notification est prise en charge (delta appliqué ou
+     * rechargement complet lancé après détection d'un trou de version).
+     */
+    _applyKitchenDelta(delta) {
+        if (!delta || this._kitchenVersion === null || this._kitchenVersion === undefined) {
+            return false;
+        }
+        if (this.state.isLoading) {
+            // Un chargement est en cours : il inclura ce changement ou sera suivi d'un autre
+            return false;
+        }
+        if (delta.version !== this._kitchenVersion && delta.base_version !== this._kitchenVersion) {
+            console.warn(
+                `[KITCHEN EXT] ⚠️ Version gap (local ${this._kitchenVersion}, ` +
+                `delta ${delta.base_version} → ${delta.version}) - full reload`
+            );
+            this._kitchenCursor = null;
+            this._kitchenVersion = null;
+            this.loadOrders();
+            return true;
+        }
+
+        const orderId = delta.order_id;
+        let orderIds = [...this._store.orderIds];
+        const lineIds = this._store.lineIds
+            .filter(id => this._lineOrderId(this._store.lines.get(id)) !== orderId);
+        const newLines = delta.order ? (delta.order_lines || []) : [];
+
+        if (delta.order) {
+            if (!this._store.orders.has(orderId)) {
+                // Nouvelle commande : en tête (tri get_details : date décroissante)
+                orderIds.unshift(orderId);
+            }
+            lineIds.push(...newLines.map(l => l.id));
+            lineIds.sort((a, b) => a - b);
+        } else {
+            orderIds = orderIds.filter(id => id !== orderId);
+        }
+
+        if (Array.isArray(delta.prepare_times) && delta.prepare_times.length > 0) {
+            const known = new Map((this.state.prepare_times || []).map(item => [item.id, item]));
+            for (const item of this._formatPrepareTimes(delta.prepare_times)) {
+                known.set(item.id, item);
+            }
+            this.state.prepare_times = [...known.values()];
+        }
+
+        const changedOrders = this._patchKitchenStore(delta.order ? [delta.order] : [], newLines, orderIds, lineIds);
+        this._kitchenVersion = delta.version;
+        this._refreshKitchenDerivedState(changedOrders);
+
+        console.log(`[KITCHEN EXT] ⚡ Bus delta applied for order ${orderId} (version ${delta.version})`);
+        return true;
+    },
+
+    /**
+     * ✅ Store client normalisé : commandes et lignes indexées par id, index
+     * commande → lignes et compteurs par statut tenus à jour à chaque patch.
+     * state.order_details / state.lines (consommés par le template de base)
+     * ne sont reconstruits que si la liste visible change ; un enregistrement
+     * modifié est patché en place, les autres gardent leur identité.
+     */
+    _initKitchenStore() {
+        this._store = {
+            orders: new Map(),
+            lines: new Map(),
+            linesByOrder: new Map(),
+            // Statut compté pour chaque commande (indépendant des mutations locales)
+            orderStatus: new Map(),
+            // Listes complètes et ordonnées (state n'en contient que la fenêtre rendue)
+            orderIds: [],
+            lineIds: [],
+            counts: { draft: 0, waiting: 0, ready: 0 },
+        };
+    },
+
+    _resetKitchenStore() {
+        this._initKitchenStore();
+        this.state.order_details = [];
+        this.state.lines = [];
+        this.state.draft_count = 0;
+        this.state.waiting_count = 0;
+        this.state.ready_count = 0;
+    },
+
+    _lineOrderId(line) {
+        return Array.isArray(line.order_id) ? line.order_id[0] : line.order_id;
+    },
+
+    /**
+     * ✅ Lignes d'une commande via l'index (sans parcourir state.lines)
+     */
+    getLinesForOrder(orderId) {
+        const lineIds = this._store.linesByOrder.get(orderId);
+        return lineIds ? [...lineIds].map(id => this._store.lines.get(id)) : [];
+    },
+
+    _isSameKitchenRecord(existing, record) {
+        return !!existing.write_date && existing.write_date === record.write_date;
+    },
+
+    _setKitchenOrderStatus(orderId, status) {
+        const { counts, orderStatus } = this._store;
+        const previous = orderStatus.get(orderId);
+        if (previous in counts) {
+            counts[previous]--;
+        }
+        if (status === undefined) {
+            orderStatus.delete(orderId);
+            return;
+        }
+        if (status in counts) {
+            counts[status]++;
+        }
+        orderStatus.set(orderId, status);
+    },
+
+    _indexKitchenLine(line, add) {
+        const orderId = this._lineOrderId(line);
+        let lineIds = this._store.linesByOrder.get(orderId);
+        if (add) {
+            if (!lineIds) {
+                lineIds = new Set();
+                this._store.linesByOrder.set(orderId, lineIds);
+            }
+            lineIds.add(line.id);
+        } else if (lineIds) {
+            lineIds.delete(line.id);
+            if (!lineIds.size) {
+                this._store.linesByOrder.delete(orderId);
+            }
+        }
+    },
+
+    /**
+     * ✅ Applique des enregistrements modifiés au store.
+     * `orderIds` / `lineIds` donnent la liste complète (et l'ordre) des
+     * enregistrements visibles : les autres sont retirés.
+     * Retourne les commandes ajoutées ou modifiées.
+     */
+    _patchKitchenStore(orders, lines, orderIds, lineIds) {
+        const store = this._store;
+        const changedOrders = [];
+
+        const visibleOrders = new Set(orderIds);
+        for (const id of [...store.orders.keys()]) {
+            if (!visibleOrders.has(id)) {
+                store.orders.delete(id);
+                this._setKitchenOrderStatus(id, undefined);
+            }
+        }
+        const visibleLines = new Set(lineIds);
+        for (const [id, line] of [...store.lines]) {
+            if (!visibleLines.has(id)) {
+                this._indexKitchenLine(line, false);
+                store.lines.delete(id);
+            }
+        }
+
+        for (const order of orders) {
+            const existing = store.orders.get(order.id);
+            if (!existing) {
+                store.orders.set(order.id, order);
+                changedOrders.push(order);
+            } else if (!this._isSameKitchenRecord(existing, order)) {
+                Object.assign(existing, order);
+                changedOrders.push(existing);
+            } else {
+                continue;
+            }
+            this._setKitchenOrderStatus(order.id, order.order_status);
+        }
+
+        for (const line of lines) {
+            const existing = store.lines.get(line.id);
+            if (!existing) {
+                store.lines.set(line.id, line);
+                this._indexKitchenLine(line, true);
+            } else if (!this._isSameKitchenRecord(existing, line)) {
+                this._indexKitchenLine(existing, false);
+                Object.assign(existing, line);
+                this._indexKitchenLine(existing, true);
+            }
+        }
+
+        store.orderIds = orderIds;
+        store.lineIds = lineIds;
+        this._renderKitchenWindow();
+        return changedOrders;
+    },
+
+    /**
+     * ✅ Rendu fenêtré : state.order_details ne contient que les
+     * `_renderLimit` premières commandes de chaque statut (l'ordre global est
+     * conservé, un onglet filtré par statut a toujours sa première page) et
+     * state.lines uniquement leurs lignes. Les compteurs viennent du store.
+     */
+    _renderKitchenWindow() {
+        const store = this._store;
+        const perStatus = {};
+        const windowIds = store.orderIds.filter(id => {
+            const status = store.orderStatus.get(id);
+            perStatus[status] = (perStatus[status] || 0) + 1;
+            return perStatus[status] <= this._renderLimit;
+        });
+        const mounted = new Set(windowIds);
+        const windowLineIds = store.lineIds.filter(id => mounted.has(this._lineOrderId(store.lines.get(id))));
+
+        this._syncKitchenArray('order_details', store.orders, windowIds);
+        this._syncKitchenArray('lines', store.lines, windowLineIds);
+    },
+
+    /**
+     * ✅ Défilement du conteneur des tickets : près de la fin on monte la
+     * page suivante, revenu en haut on redescend à la fenêtre initiale.
+     * Les autres défilements (liste de lignes d'un ticket, menus...) sont ignorés.
+     */
+    _onKitchenScroll(ev) {
+        const target = ev.target === document ? document.scrollingElement : ev.target;
+        if (this._scrollFrame || !this._isTicketScroller(target)) {
+            return;
+        }
+        this._scrollFrame = requestAnimationFrame(() => {
+            this._scrollFrame = null;
+            this._updateRenderWindow(target);
+        });
+    },
+
+    /**
+     * Conteneur des tickets : le premier élément défilé qui englobe le tableau
+     * de bord, ou qui est à l'intérieur et occupe au moins la moitié de sa
+     * surface (la liste de lignes d'un ticket est bien plus petite).
+     * Une fois identifié, lui seul pilote la fenêtre de rendu.
+     */
+    _isTicketScroller(el) {
+        if (!(el instanceof Element)) {
+            return false;
+        }
+        if (this._ticketScroller && !this._ticketScroller.isConnected) {
+            this._ticketScroller = null;
+        }
+        if (this._ticketScroller) {
+            return el === this._ticketScroller;
+        }
+        const root = this._dashboardEl;
+        if (!root || !root.isConnected) {
+            return false;
+        }
+        const isContainer = el.contains(root) || (
+            root.contains(el)
+            && el.clientHeight * 2 >= root.clientHeight
+            && el.clientWidth * 2 >= root.clientWidth
+        );
+        if (isContainer) {
+            this._ticketScroller = el;
+        }
+        return isContainer;
+    },
+
+    _updateRenderWindow(el) {
+        const horizontal = el.scrollWidth > el.clientWidth && el.scrollHeight <= el.clientHeight;
+        const position = horizontal ? el.scrollLeft : el.scrollTop;
+        const viewport = horizontal ? el.clientWidth : el.clientHeight;
+        const extent = horizontal ? el.scrollWidth : el.scrollHeight;
+        if (!viewport || extent <= viewport) {
+            return;
+        }
+
+        let limit = this._renderLimit;
+        if (extent - position - viewport < viewport && this._store.orderIds.length > this.state.order_details.length) {
+            limit += KITCHEN_RENDER_STEP;
+        } else if (position < viewport && limit > KITCHEN_RENDER_WINDOW) {
+            limit = KITCHEN_RENDER_WINDOW;
+        }
+
+        if (limit !== this._renderLimit) {
+            console.log(`[KITCHEN EXT] 🪟 Render window: ${this._renderLimit} → ${limit} tickets per status`);
+            this._renderLimit = limit;
+            this._renderKitchenWindow();
+        }
+    },
+
+    /**
+     * ✅ Reconstruit un tableau du state uniquement si la liste d'ids a changé.
+     * Le store référence ensuite les objets réactifs du state : les patchs
+     * suivants (Object.assign) ne notifient que les champs réellement modifiés.
+     */
+    _syncKitchenArray(key, records, ids) {
+        const current = this.state[key] || [];
+        if (current.length === ids.length && ids.every((id, index) => current[index]?.id === id)) {
+            return false;
+        }
+        this.state[key] = ids.map(id => records.get(id));
+        for (const record of this.state[key]) {
+            records.set(record.id, record);
+        }
+        return true;
+    },
+
 
     /**
      * ✅ Validation des messages bus (existant)
@@ -889,11 +1711,15 @@ _setupBackendBusListener() {
 
         const relevantMessages = [
             'new_order', 'order_status_change', 'order_accepted', 
-            'order_completed', 'order_cancelled', 'order_line_updated'
+            'order_completed', 'order_cancelled', 'order_line_updated',
+            'order_lines_updated'
         ];
 
         if (relevantMessages.includes(message.type)) {
             console.log(`[KITCHEN EXT] ✅ Processing: ${message.type}`);
+            if (message._deltaApplied) {
+                return;
+            }
             
             // ✅ AJOUTER UN DÉLAI pour laisser le temps à la BD de se mettre à jour
             setTimeout(() => {
@@ -922,10 +1748,25 @@ _setupBackendBusListener() {
         }
         
         // Arrêter le polling
-        if (this._pollingInterval) {
-            clearInterval(this._pollingInterval);
+        this._pollingStopped = true;
+        if (this._pollTimeout) {
+            clearTimeout(this._pollTimeout);
+            this._pollTimeout = null;
             console.log('[KITCHEN EXT] ⏰ Polling stopped');
         }
+
+        // Arrêter le rendu fenêtré
+        document.removeEventListener('scroll', this._scrollHandler, { capture: true });
+        if (this._scrollFrame) {
+            cancelAnimationFrame(this._scrollFrame);
+            this._scrollFrame = null;
+        }
+
+        // Arrêter le ticker des countdowns
+        if (this._countdownTimer) {
+            clearTimeout(this._countdownTimer);
+            this._countdownTimer = null;
+        }
         
         // Retirer les écouteurs
         try {
@@ -4,6 +4,10 @@ import { ActionpadWidget } from "@point_of_sale/app/screens/product_screen/actio
 import { AlertDialog } from "@web/core/confirmation_dialog/confirmation_dialog";
 import { _t } from "@web/core/l10n/translation";
 
+// Suivi du traitement asynchrone de la file cuisine (délais croissants, ~30s au total)
+const KITCHEN_QUEUE_MAX_POLLS = 8;
+const KITCHEN_QUEUE_MAX_DELAY = 5000;
+
 patch(ActionpadWidget.prototype, {
     async getAllScreensForOrder() {
         const order = this.pos.get_order();
@@ -74,6 +78,65 @@ patch(ActionpadWidget.prototype, {
         }
     },
 
+    /**
+     * ✅ Dépose les commandes dans la file cuisine et retourne les ids de file.
+     * Le serveur répond dès que le payload est enregistré.
+     */
+    async enqueueKitchenOrders(orders) {
+        const ack = await this.env.services.orm.call(
+            "kitchen.order.queue",
+            "enqueue_kitchen_orders",
+            [orders]
+        );
+        if (!ack || !ack.queued) {
+            throw new Error(ack?.error || "Kitchen queue rejected the order");
+        }
+        console.log(`[ACTION PAD] 📥 Order queued (queue ids: ${ack.queue_ids.join(', ')})`);
+        return ack.queue_ids;
+    },
+
+    /**
+     * ✅ Suit en arrière-plan le traitement des entrées de file, sans bloquer la caisse.
+     * onDone(statuses) est appelé quand toutes les entrées sont traitées avec succès.
+     */
+    watchKitchenQueue(queueIds, onDone) {
+        let attempt = 0;
+        const poll = async () => {
+            attempt++;
+            let statuses = null;
+            try {
+                statuses = await this.env.services.orm.call(
+                    "kitchen.order.queue",
+                    "get_queue_status",
+                    [queueIds]
+                );
+            } catch (error) {
+                console.warn('[ACTION PAD] Queue status check failed:', error);
+            }
+
+            if (statuses && !statuses.some(s => s.state === 'pending')) {
+                const failed = statuses.filter(s => s.state === 'failed');
+                if (failed.length > 0) {
+                    console.error('[ACTION PAD] ❌ Kitchen processing failed:', failed);
+                    this.env.services.notification?.add(
+                        _t("Kitchen could not process the order. Please send it again."),
+                        { type: 'danger' }
+                    );
+                } else if (onDone) {
+                    onDone(statuses);
+                }
+                return;
+            }
+
+            if (attempt < KITCHEN_QUEUE_MAX_POLLS) {
+                setTimeout(poll, Math.min(500 * 2 ** attempt, KITCHEN_QUEUE_MAX_DELAY));
+            } else {
+                console.warn(`[ACTION PAD] ⚠ Queue ${queueIds.join(', ')} still pending`);
+            }
+        };
+        setTimeout(poll, 500);
+    },
+
     /**
      * ✅ CORRECTION: Envoyer les notifications SANS attendre
      */
@@ -88,23 +151,23 @@ patch(ActionpadWidget.prototype, {
 
             // ✅ Global Broadcast
             this.sendGlobalBroadcast(screen, orderData);
-
-            // ✅ Backend (async, sans bloquer)
-            this.sendBackendNotification(screen.id, orderData)
-                .catch(error => {
-                    console.warn(`[ACTION PAD] Backend notification failed:`, error);
-                });
         }
 
+        // ✅ Backend : un seul appel pour tous les écrans (async, sans bloquer)
+        this.sendBackendNotification(matchingScreens.map(s => s.id), orderData)
+            .catch(error => {
+                console.warn(`[ACTION PAD] Backend notification failed:`, error);
+            });
+
         console.log('[ACTION PAD] ✅ All notifications sent');
     },
 
-    async sendBackendNotification(screenId, orderData) {
+    async sendBackendNotification(screenIds, orderData) {
         try {
             const result = await this.env.services.orm.call(
                 "pos.order",
                 "trigger_kitchen_notifications",
-                [orderData.pos_reference, [screenId]]
+                [orderData.pos_reference, [].concat(screenIds)]
             );
             
             console.log(`[ACTION PAD] ✅ Backend RPC result:`, result);
@@ -219,6 +282,7 @@ patch(ActionpadWidget.prototype, {
                     'product_id': orders.product_id.id,
                     'tax_ids': [[6, 0, orders.tax_ids.map((tax) => tax.id)]],
                     'id': orders.id,
+                    'uuid': orders.uuid,
                     'pack_lot_ids': [],
                     'full_product_name': orders.product_id.display_name,
                     'price_extra': orders.price_extra,
@@ -256,18 +320,16 @@ patch(ActionpadWidget.prototype, {
                 lines_count: line.length
             });
 
-            // ✅ Créer la commande cuisine
-            await this.env.services.orm.call(
-                "pos.order", 
-                "create_or_update_kitchen_order", 
-                [orders]
-            );
+            // ✅ Déposer la commande dans la file cuisine (accusé de réception immédiat)
+            const queueIds = await this.enqueueKitchenOrders(orders);
             
             console.log('[ACTION PAD] ✅ Order submitted successfully');
 
-            // ✅ Envoyer les notifications
+            // ✅ Envoyer les notifications une fois la commande traitée côté serveur
             if (matchingScreens.length > 0) {
-                await this.forceNotificationToScreens(matchingScreens, orders[0]);
+                this.watchKitchenQueue(queueIds, () => {
+                    this.forceNotificationToScreens(matchingScreens, orders[0]);
+                });
                 
                 // ✅ Notification visuelle
                 if (this.env.services.notification) {
@@ -285,6 +285,7 @@ patch(ActionpadWidget.prototype, {
                                 [6, 0, orders.tax_ids.map((tax) => tax.id)]
                             ],
                             'id': orders.id,
+                            'uuid': orders.uuid,
                             'pack_lot_ids': [],
                             'full_product_name': orders.product_id.display_name,
                             'price_extra': orders.price_extra,
@@ -326,33 +327,33 @@ patch(ActionpadWidget.prototype, {
                         screen_names: matchingScreens.map(s => s.name)
                     });
 
-                    // ✅ Étape 7: Appel RPC pour créer/mettre à jour la commande cuisine
-                    await self.env.services.orm.call(
-                        "pos.order", 
-                        "create_or_update_kitchen_order", 
-                        [orders]
-                    );
+                    // ✅ Étape 7: Dépôt dans la file cuisine (accusé de réception immédiat)
+                    const queueIds = await this.enqueueKitchenOrders(orders);
                     
                     console.log('[ACTION PAD] ✅ Order submitted successfully');
                     
-                    // ✅ Étape 8: Trigger le bus pour TOUS les écrans concernés AVEC NOTIFICATION
+                    // ✅ Étape 8: Trigger le bus pour TOUS les écrans concernés une fois la commande traitée
                     if (matchingScreens.length > 0) {
-                        for (const screen of matchingScreens) {
-                            // ✅ NOTIFICATION: Déclencher l'événement de nouvelle commande
-                            this.env.bus.trigger('pos-kitchen-new-order', {
-                                screen_id: screen.id,
-                                screen_name: screen.name,
-                                config_id: this.pos.get_order().config_id.id,
-                                order_reference: this.pos.get_order().pos_reference,
-                                order_data: orders[0],
-                                timestamp: new Date().toISOString(),
-                                type: 'new_order' // Type d'événement pour le filtrage
-                            });
+                        const orderData = orders[0];
+                        const configId = this.pos.get_order().config_id.id;
+                        this.watchKitchenQueue(queueIds, () => {
+                            for (const screen of matchingScreens) {
+                                // ✅ NOTIFICATION: Déclencher l'événement de nouvelle commande
+                                this.env.bus.trigger('pos-kitchen-new-order', {
+                                    screen_id: screen.id,
+                                    screen_name: screen.name,
+                                    config_id: configId,
+                                    order_reference: orderData.pos_reference,
+                                    order_data: orderData,
+                                    timestamp: new Date().toISOString(),
+                                    type: 'new_order' // Type d'événement pour le filtrage
+                                });
+                                
+                                console.log(`[ACTION PAD] 📡 Bus notification sent to screen "${screen.name}" (ID: ${screen.id})`);
+                            }
                             
-                            console.log(`[ACTION PAD] 📡 Bus notification sent to screen "${screen.name}" (ID: ${screen.id})`);
-                        }
-                        
-                        console.log(`[ACTION PAD] ✅ Notifications sent to ${matchingScreens.length} screens`);
+                            console.log(`[ACTION PAD] ✅ Notifications sent to ${matchingScreens.length} screens`);
+                        });
                     }
 
                     // ✅ Étape 9: Afficher un message de confirmation (optionnel)
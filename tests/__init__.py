@@ -0,0 +1,4 @@
+# -*- coding: utf-8 -*-
+
+from . import test_kitchen_line_diff
+from . import test_kitchen_notifications
@@ -0,0 +1,55 @@
+# -*- coding: utf-8 -*-
+from odoo.addons.point_of_sale.tests.common import TestPoSCommon
+
+
+class KitchenTestCommon(TestPoSCommon):
+    """POS, catégorie cuisine et écran partagés par les tests cuisine"""
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.config = cls.basic_config
+        cls.kitchen_categ = cls.env['pos.category'].create({'name': 'Kitchen'})
+        cls.product = cls.create_product('Burger', cls.categ_basic, 10.0)
+        cls.product2 = cls.create_product('Fries', cls.categ_basic, 4.0)
+        (cls.product | cls.product2).pos_categ_ids = [(6, 0, cls.kitchen_categ.ids)]
+        cls.screen = cls.env['kitchen.screen'].create({
+            'name': 'Grill',
+            'pos_config_id': cls.config.id,
+            'pos_categ_ids': [(6, 0, cls.kitchen_categ.ids)],
+        })
+
+    def _pos_line(self, product, qty=1, note='', uuid=False):
+        """Ligne (0, 0, vals) telle qu'envoyée par le POS"""
+        return (0, 0, {
+            'product_id': product.id,
+            'qty': qty,
+            'price_unit': product.lst_price,
+            'price_subtotal': product.lst_price * qty,
+            'price_subtotal_incl': product.lst_price * qty,
+            'full_product_name': product.display_name,
+            'note': note,
+            'uuid': uuid,
+        })
+
+    def _line_vals(self, pos_line):
+        return self.env['pos.order']._prepare_kitchen_line_vals(pos_line, self.config.id)
+
+    def _create_kitchen_order(self, pos_lines=None, line_status='waiting'):
+        self.open_new_session()
+        pos_lines = pos_lines or [self._pos_line(self.product, qty=2)]
+        return self.env['pos.order'].create({
+            'session_id': self.pos_session.id,
+            'config_id': self.config.id,
+            'pos_reference': 'Order 00001-001-0001',
+            'is_cooking': True,
+            'order_status': 'waiting',
+            'amount_tax': 0.0,
+            'amount_total': 20.0,
+            'amount_paid': 0.0,
+            'amount_return': 0.0,
+            'lines': [
+                (0, 0, dict(self._line_vals(pos_line), order_status=line_status))
+                for pos_line in pos_lines
+            ],
+        })
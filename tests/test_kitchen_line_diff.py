@@ -0,0 +1,80 @@
+# -*- coding: utf-8 -*-
+from odoo.tests import tagged
+
+from .common import KitchenTestCommon
+
+
+@tagged('post_install', '-at_install')
+class TestKitchenLineDiff(KitchenTestCommon):
+    """Rapprochement des lignes d'une commande re-soumise (_diff_kitchen_lines)"""
+
+    def _diff(self, order, pos_lines):
+        return self.env['pos.order']._diff_kitchen_lines(
+            order.lines, [self._line_vals(pos_line) for pos_line in pos_lines]
+        )
+
+    def test_unchanged_lines_by_ref(self):
+        pos_lines = [self._pos_line(self.product, 2, uuid='a'), self._pos_line(self.product2, 1, uuid='b')]
+        order = self._create_kitchen_order(pos_lines)
+        self.assertEqual(self._diff(order, pos_lines), [])
+
+    def test_qty_change_resets_line_status(self):
+        order = self._create_kitchen_order([self._pos_line(self.product, 2, uuid='a')], line_status='ready')
+        commands = self._diff(order, [self._pos_line(self.product, 3, uuid='a')])
+        self.assertEqual(len(commands), 1)
+        command, line_id, changes = commands[0]
+        self.assertEqual((command, line_id), (1, order.lines.id))
+        self.assertEqual(changes['qty'], 3)
+        self.assertEqual(changes['order_status'], 'draft')
+
+    def test_note_change_resets_line_status(self):
+        order = self._create_kitchen_order([self._pos_line(self.product, 1, uuid='a')], line_status='ready')
+        commands = self._diff(order, [self._pos_line(self.product, 1, note='No onion', uuid='a')])
+        self.assertEqual(commands, [(1, order.lines.id, {'note': 'No onion', 'order_status': 'draft'})])
+
+    def test_price_change_keeps_line_status(self):
+        order = self._create_kitchen_order([self._pos_line(self.product, 1, uuid='a')], line_status='ready')
+        pos_line = self._pos_line(self.product, 1, uuid='a')
+        pos_line[2].update(price_unit=8.0, price_subtotal=8.0, price_subtotal_incl=8.0)
+        commands = self._diff(order, [pos_line])
+        self.assertEqual(len(commands), 1)
+        self.assertNotIn('order_status', commands[0][2])
+        self.assertNotIn('qty', commands[0][2])
+
+    def test_fallback_on_product_and_note(self):
+        """Référence inconnue : rapprochement par produit + note, la référence est mise à jour"""
+        order = self._create_kitchen_order([self._pos_line(self.product, 2, uuid='old')])
+        commands = self._diff(order, [self._pos_line(self.product, 2, uuid='new')])
+        self.assertEqual(commands, [(1, order.lines.id, {'kitchen_line_ref': 'new'})])
+
+    def test_product_change_replaces_line(self):
+        """Même référence mais autre produit : nouvelle ligne, l'ancienne est supprimée"""
+        order = self._create_kitchen_order([self._pos_line(self.product, 1, uuid='a')])
+        commands = self._diff(order, [self._pos_line(self.product2, 1, uuid='a')])
+        self.assertEqual(len(commands), 2)
+        self.assertEqual(commands[0][0], 0)
+        self.assertEqual(commands[0][2]['product_id'], self.product2.id)
+        self.assertEqual(commands[1], (2, order.lines.id))
+
+    def test_duplicate_lines_match_distinct_records(self):
+        """Deux lignes identiques sans référence : chacune rapprochée d'une ligne différente"""
+        order = self._create_kitchen_order([self._pos_line(self.product, 1), self._pos_line(self.product, 1)])
+        commands = self._diff(order, [
+            self._pos_line(self.product, 1),
+            self._pos_line(self.product, 1),
+            self._pos_line(self.product, 1),
+        ])
+        self.assertEqual([command[0] for command in commands], [0])
+
+    def test_duplicate_ref_falls_back(self):
+        """Une référence reçue deux fois n'est rapprochée qu'une fois"""
+        order = self._create_kitchen_order([self._pos_line(self.product, 1, uuid='a'), self._pos_line(self.product, 1)])
+        commands = self._diff(order, [self._pos_line(self.product, 1, uuid='a'), self._pos_line(self.product, 1, uuid='a')])
+        unreferenced = order.lines.filtered(lambda l: not l.kitchen_line_ref)
+        self.assertEqual(commands, [(1, unreferenced.id, {'kitchen_line_ref': 'a'})])
+
+    def test_removed_line_is_deleted(self):
+        order = self._create_kitchen_order([self._pos_line(self.product, 1, uuid='a'), self._pos_line(self.product2, 1, uuid='b')])
+        removed = order.lines.filtered(lambda l: l.product_id == self.product2)
+        commands = self._diff(order, [self._pos_line(self.product, 1, uuid='a')])
+        self.assertEqual(commands, [(2, removed.id)])
@@ -0,0 +1,63 @@
+# -*- coding: utf-8 -*-
+from odoo.tests import tagged
+
+from .common import KitchenTestCommon
+
+
+@tagged('post_install', '-at_install')
+class TestKitchenNotifications(KitchenTestCommon):
+    """Notifications bus des écrans cuisine (flush precommit + journal)"""
+
+    def test_flush_line_update_with_delta(self):
+        """Le delta compact (dates en epoch, ids) est journalisé et envoyé au commit"""
+        order = self._create_kitchen_order()
+        self.env.flush_all()
+        self.env.cr.precommit.run()
+
+        order.lines.write({'order_status': 'ready'})
+        self.env.flush_all()
+        self.env.cr.precommit.run()
+
+        event = self.env['kitchen.screen.event'].search([
+            ('screen_id', '=', self.screen.id),
+            ('notification_type', '=', 'order_lines_updated'),
+        ])
+        self.assertEqual(len(event), 1)
+        message = event.message
+        self.assertEqual(message['o'], order.id)
+        self.assertEqual(message['c'], self.config.id)
+        self.assertEqual(message['q'], self.screen.kitchen_event_seq)
+
+        # Delta compact : valeurs positionnelles selon le schéma du dictionnaire bus
+        schema = self.env['pos.order']._get_kitchen_delta_schema()
+        order_fields, line_fields = schema['order']['fields'], schema['line']['fields']
+        delta = message['d']
+        self.assertNotIn('n', message)
+        self.assertEqual(delta['od'][order_fields.index('id')], order.id)
+        self.assertEqual(delta['od'][order_fields.index('config_id')], self.config.id)
+        self.assertIsInstance(delta['od'][order_fields.index('write_date')], int)
+        self.assertEqual([line[0] for line in delta['l']], order.lines.ids)
+        self.assertEqual(delta['l'][0][line_fields.index('order_status')], 'ready')
+        self.assertEqual(delta['l'][0][line_fields.index('order_id')], order.id)
+
+    def test_line_updates_merged_per_order(self):
+        """Deux écritures de lignes d'une commande : un seul message avec les deux lignes"""
+        order = self._create_kitchen_order(pos_lines=[
+            self._pos_line(self.product, qty=1),
+            self._pos_line(self.product2, qty=1),
+        ])
+        self.env.flush_all()
+        self.env.cr.precommit.run()
+
+        line_a, line_b = order.lines
+        line_a.write({'order_status': 'ready'})
+        line_b.write({'order_status': 'ready'})
+        self.env.flush_all()
+        self.env.cr.precommit.run()
+
+        event = self.env['kitchen.screen.event'].search([
+            ('screen_id', '=', self.screen.id),
+            ('notification_type', '=', 'order_lines_updated'),
+        ])
+        self.assertEqual(len(event), 1)
+        self.assertEqual(sorted(line[0] for line in event.message['l']), sorted(order.lines.ids))